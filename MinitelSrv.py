@@ -3,14 +3,20 @@ Created on 18 Oct 2019
 
 @author: mdonze
 '''
+import argparse
 import logging
 import os
 import yaml
 import logging.config
 
 from minitel_server import constant
-from minitel_server.tcp_server import TCPServer
+from minitel_server.acceptor import Acceptor
+from minitel_server.async_server import AsyncServer
+from minitel_server.workers import WorkerSupervisor
 from minitel_server.configuration import Configuration
+from minitel_server.handlers import HandlerResolver
+from minitel_server.page_bundle import PageBundle
+from minitel_server.page_watcher import PageWatcher
 
 logger = logging.getLogger('main')
 
@@ -41,11 +47,8 @@ def setup_logging(default_path='logging.yaml', default_level=logging.INFO, env_k
         print('Failed to load configuration file. Using default configs')
 
 
-def main():
-    setup_logging()
-    Configuration.load_configuration()
-
-    # Run the server
+def get_service_ports():
+    """ Gets the list of service ports from the pages folder """
     ports = []
     for dirName in next(os.walk(Configuration.page_folder))[1]:
         logger.info("Searching service in " + dirName)
@@ -53,14 +56,44 @@ def main():
             ports.append(int(dirName))
         except:
             pass
-    servers = []
-    for p in ports:
-        srv = TCPServer(p)
-        srv.start()
-        servers.append(srv)
-
-    for s in servers:
-        s.join()
+    return ports
+
+
+def serve(ports, use_asyncio=False, reuse_port=False):
+    """ Serves the given ports until interrupted """
+    if Configuration.watch_pages:
+        if PageBundle.get_instance() is not None:
+            logger.info("Pages are served from {}, changes of the pages folder are served once it is rebuilt "
+                        "(handler modules are reloaded)".format(Configuration.page_bundle))
+        PageWatcher(ports).start()
+    if use_asyncio:
+        AsyncServer(ports, reuse_port=reuse_port).run()
+        return
+
+    acceptor = Acceptor(ports, reuse_port)
+    acceptor.start()
+    acceptor.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Minitel server')
+    parser.add_argument('--asyncio', action='store_true',
+                        help='Serve all sessions from a single asyncio event loop')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Number of worker processes sharing the service ports (SO_REUSEPORT)')
+    args = parser.parse_args()
+
+    setup_logging()
+    Configuration.load_configuration()
+
+    # Run the server
+    ports = get_service_ports()
+    if Configuration.warm_up:
+        HandlerResolver.get_instance().warm_up(ports)
+    if args.workers > 0:
+        WorkerSupervisor(args.workers, serve, (ports, args.asyncio, True)).run()
+    else:
+        serve(ports, args.asyncio)
 
 
 if __name__ == '__main__':
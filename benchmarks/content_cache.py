@@ -0,0 +1,61 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+
+Compares drawing a page by reading the file and encoding it for each
+visitor with drawing it from the content cache, with and without the
+screen model (the cached content holds the screen left by the page)
+
+Usage: python benchmarks/content_cache.py [vdt_file]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from minitel_server.content_cache import ContentCache  # noqa: E402
+from minitel_server.terminal import Terminal  # noqa: E402
+
+DEFAULT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                            'pages', '3615', '3615.vdt')
+
+
+class BenchTerminal(Terminal):
+    """ Terminal dropping its output """
+
+    def _send(self, bytes_data):
+        pass
+
+
+class UncachedTerminal(BenchTerminal):
+    CACHE_FILES = False
+
+
+def draw(terminal, filename):
+    terminal.draw_file(filename)
+    terminal.flush()
+
+
+def main():
+    filename = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FILE
+    ContentCache._instance = ContentCache(1024 * 1024)
+    number = 2000
+    uncached = timeit.timeit(lambda: draw(UncachedTerminal(None), filename), number=number) / number
+    terminal = BenchTerminal(None)
+    cached = timeit.timeit(lambda: draw(terminal, filename), number=number) / number
+    terminal.use_screen_model(True)
+    modelled = timeit.timeit(lambda: draw(terminal, filename), number=number) / number
+    content = ContentCache.get_instance().get(filename)
+    screen = terminal.screen
+    feed = timeit.timeit(lambda: screen.feed(content.data), number=number) / number
+    print("read and encode       {:>10.2f}us".format(uncached * 1e6))
+    print("content cache         {:>10.2f}us {:>8.1f}x".format(cached * 1e6, uncached / cached))
+    print("content cache, screen {:>10.2f}us {:>8.1f}x".format(modelled * 1e6, uncached / modelled))
+    print("screen feed           {:>10.2f}us".format(feed * 1e6))
+    print(ContentCache.get_instance().stats())
+
+
+if __name__ == '__main__':
+    main()
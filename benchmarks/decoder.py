@@ -0,0 +1,59 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+
+Benchmarks the keyboard input decoder and checks that any chunking of
+the same input gives the same events
+
+Usage: python benchmarks/decoder.py [iterations]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from minitel_server.decoder import InputDecoder  # noqa: E402
+
+# Typed text with accents, function keys, acknowledges and protocol data
+SAMPLE = (b'Bonjour \x19\x42ete \x19\x4Bca \x19\x41a \x19\x23'
+          b'\x13\x47\x13\x41\x13\x53\x1b\x39\x41\x1b\x3a\x41\x42\x1b\x3b\x41\x42\x43'
+          b'\x13\x48\x13\x42 ') * 20
+
+
+def fuzz(iterations, seed=0):
+    """ Feeds the sample split at random positions """
+    rng = random.Random(seed)
+    expected = InputDecoder().feed(SAMPLE)
+    for _ in range(iterations):
+        decoder = InputDecoder()
+        events = []
+        position = 0
+        while position < len(SAMPLE):
+            size = rng.randint(1, 16)
+            events += decoder.feed(SAMPLE[position:position + size])
+            position += size
+        assert events == expected, "Chunking changed the decoded events"
+    return len(expected)
+
+
+def throughput(iterations):
+    decoder = InputDecoder()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        decoder.feed(SAMPLE)
+    elapsed = time.perf_counter() - start
+    return len(SAMPLE) * iterations / elapsed
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    events = fuzz(iterations // 10)
+    print("fuzz: {} random chunkings, {} events each, identical".format(iterations // 10, events))
+    print("throughput: {:.2f} MB/s".format(throughput(iterations) / 1e6))
+
+
+if __name__ == '__main__':
+    main()
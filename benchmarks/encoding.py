@@ -0,0 +1,92 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+
+Microbenchmarks of the output encoding path
+Compares the previous per byte Python loops with the translation tables
+
+Usage: python benchmarks/encoding.py [vdt_file]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from minitel_server.encoding import add_even_parity, remove_parity  # noqa: E402
+from minitel_server.terminal import Terminal  # noqa: E402
+
+DEFAULT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                            'pages', '3615', '3615.vdt')
+
+
+def legacy_add_even_parity(data):
+    ret = bytearray()
+    for b in data:
+        if bin(b).count('1') % 2:
+            b |= 0x80
+        ret.append(b)
+    return ret
+
+
+def legacy_remove_parity(data):
+    ret = []
+    for c in data:
+        c &= 0x7f
+        ret.append(c)
+    return ret
+
+
+def legacy_encode(*data):
+    bytes_data = bytearray()
+    for d in data:
+        if isinstance(d, str):
+            bytes_data += bytearray(d, 'utf-8')
+        elif isinstance(d, int):
+            bytes_data += bytearray(d.to_bytes(1, 'big'))
+        else:
+            bytes_data += bytearray(d)
+    return legacy_add_even_parity(bytes_data)
+
+
+class PlainTerminal(Terminal):
+    """ Terminal without REP compression, sends the same bytes as the legacy encoder """
+    AUTO_REPEAT = False
+
+
+def _report(name, legacy, current, number):
+    legacy_time = timeit.timeit(legacy, number=number) / number
+    current_time = timeit.timeit(current, number=number) / number
+    print("{:<24} {:>10.2f}us {:>10.2f}us {:>8.1f}x".format(
+        name, legacy_time * 1e6, current_time * 1e6, legacy_time / current_time))
+
+
+def main():
+    filename = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FILE
+    with open(filename, 'rb') as f:
+        page = f.read()
+    terminal = PlainTerminal(None)
+    attribute = (Terminal.ATTRIBUTE, Terminal.CHAR_COLOR | Terminal.WHITE)
+    move = [Terminal.CURSOR_MOVE, 0x40 | 12, 0x40 | 1]
+    assert legacy_add_even_parity(page) == add_even_parity(page)
+    assert legacy_encode(*attribute) == terminal.encode(*attribute)
+    assert legacy_encode(page) == terminal.encode(page)
+
+    print("{:<24} {:>12} {:>12} {:>9}".format('benchmark', 'legacy', 'table', 'speedup'))
+    _report('parity ({} bytes)'.format(len(page)),
+            lambda: legacy_add_even_parity(page), lambda: add_even_parity(page), 200)
+    _report('remove parity (64 bytes)',
+            lambda: legacy_remove_parity(page[:64]), lambda: remove_parity(page[:64]), 20000)
+    _report('encode attribute',
+            lambda: legacy_encode(*attribute), lambda: terminal.encode(*attribute), 20000)
+    _report('encode cursor move',
+            lambda: legacy_encode(move), lambda: terminal.encode(move), 20000)
+    _report('encode text',
+            lambda: legacy_encode('Services disponibles'),
+            lambda: terminal.encode('Services disponibles'), 20000)
+    _report('encode page', lambda: legacy_encode(page), lambda: terminal.encode(page), 200)
+
+
+if __name__ == '__main__':
+    main()
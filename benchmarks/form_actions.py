@@ -0,0 +1,55 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+
+Compares matching form texts against the raw YAML actions of a page with
+its compiled dispatch tables
+
+Usage: python benchmarks/form_actions.py [service] [page] [text]
+"""
+import os
+import re
+import sys
+import timeit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from minitel_server.configuration import Configuration  # noqa: E402
+from minitel_server.page import Page  # noqa: E402
+
+
+def match_yaml(forms, text):
+    for value in forms:
+        for action in value.get('actions', ()):
+            if 'value' in action and re.match(str(action['value']), text, re.RegexFlag.IGNORECASE):
+                if 'page' in action:
+                    return str(action['page'])
+    return None
+
+
+def match_compiled(actions, text):
+    for form_actions in actions:
+        name = form_actions.match(text)
+        if name is not None:
+            return name
+    return None
+
+
+def main():
+    service = sys.argv[1] if len(sys.argv) > 1 else '3615'
+    name = sys.argv[2] if len(sys.argv) > 2 else 'jcc.menu'
+    text = sys.argv[3] if len(sys.argv) > 3 else '3'
+    Configuration.page_folder = os.path.join(ROOT, Configuration.PAGE_LOCATION)
+    page = Page.get_page(service, name)
+    assert match_yaml(page.forms, text) == match_compiled(page.actions, text)
+    number = 100000
+    raw = timeit.timeit(lambda: match_yaml(page.forms, text), number=number) / number
+    compiled = timeit.timeit(lambda: match_compiled(page.actions, text), number=number) / number
+    print("yaml actions     {:>10.3f}us".format(raw * 1e6))
+    print("dispatch tables  {:>10.3f}us {:>8.1f}x".format(compiled * 1e6, raw / compiled))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+
+Measures the accuracy of the baud rate pacing
+Compares the per byte sleep used before with the shared BaudPacer
+
+Usage: python benchmarks/pacer_accuracy.py [duration_seconds]
+"""
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from minitel_server.pacer import BaudPacer, BAUD_RATES, bytes_per_second  # noqa: E402
+
+
+def _drain(sock, expected, result):
+    received = 0
+    while received < expected:
+        data = sock.recv(65536)
+        if not data:
+            break
+        received += len(data)
+    result.append(time.monotonic())
+
+
+def _measure(send, size):
+    server, client = socket.socketpair()
+    result = []
+    reader = threading.Thread(target=_drain, args=(client, size, result))
+    reader.start()
+    start = time.monotonic()
+    send(server, bytes(size))
+    reader.join()
+    server.close()
+    client.close()
+    return result[0] - start
+
+
+def per_byte_sleep(baud_rate):
+    """ Legacy pacing: one send and one sleep per byte """
+    delay = 1 / bytes_per_second(baud_rate)
+
+    def send(sock, data):
+        for b in data:
+            sock.send(b.to_bytes(1, 'big'))
+            time.sleep(delay)
+    return send
+
+
+def token_bucket(baud_rate):
+    """ Shared BaudPacer """
+    def send(sock, data):
+        sock.setblocking(False)
+        connection = BaudPacer.get_instance().open(sock, baud_rate)
+        connection.send(data)
+    return send
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    print("{:<16} {:>6} {:>8} {:>10} {:>10} {:>8}".format(
+        'method', 'baud', 'bytes', 'expected', 'measured', 'error'))
+    for baud_rate in BAUD_RATES:
+        size = max(int(bytes_per_second(baud_rate) * duration), 1)
+        expected = size / bytes_per_second(baud_rate)
+        for name, method in (('per_byte_sleep', per_byte_sleep), ('token_bucket', token_bucket)):
+            elapsed = _measure(method(baud_rate), size)
+            print("{:<16} {:>6} {:>8} {:>9.3f}s {:>9.3f}s {:>+7.2f}%".format(
+                name, baud_rate, size, expected, elapsed, (elapsed - expected) * 100 / expected))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+
+Compares building a Page for every navigation with getting it from the
+compiled page registry
+
+Usage: python benchmarks/page_registry.py [service] [page]
+"""
+import os
+import sys
+import timeit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from minitel_server.configuration import Configuration  # noqa: E402
+from minitel_server.page import Page  # noqa: E402
+
+
+def main():
+    service = sys.argv[1] if len(sys.argv) > 1 else '3615'
+    name = sys.argv[2] if len(sys.argv) > 2 else 'jcc.menu'
+    Configuration.page_folder = os.path.join(ROOT, Configuration.PAGE_LOCATION)
+    number = 2000
+    parsed = timeit.timeit(lambda: Page(service, name), number=number) / number
+    compiled = timeit.timeit(lambda: Page.get_page(service, name), number=number) / number
+    print("parse on navigation {:>10.2f}us".format(parsed * 1e6))
+    print("page registry       {:>10.2f}us {:>8.1f}x".format(compiled * 1e6, parsed / compiled))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+"""
+import logging
+import selectors
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread, Lock
+
+from minitel_server.configuration import Configuration
+from minitel_server.constant import SIMULATE_12000_BPS
+from minitel_server.encoding import encode_text
+from minitel_server.screen import COLUMNS
+from minitel_server.session import Session
+from minitel_server.terminal import Terminal
+
+TCP_IP = '0.0.0.0'
+logger = logging.getLogger('Acceptor')
+
+
+class Acceptor(Thread):
+    """
+    Listen for TCP connections on every service port with a single selector
+    and runs the sessions in an executor
+    """
+    BUSY_MESSAGE = "Serveur occupé, rappelez plus tard"
+
+    def __init__(self, ports, reuse_port=False, max_sessions=None):
+        """
+        Constructor
+        ports : List of ports to listen on
+        reuse_port : Allows several processes to listen on the same ports
+        max_sessions : Maximum number of concurrent sessions, callers beyond
+        are told the server is busy and hung up (default from configuration)
+        """
+        Thread.__init__(self, name='acceptor')
+        self.ports = ports
+        self.reuse_port = reuse_port
+        self.max_sessions = max_sessions or Configuration.max_sessions
+        self._selector = selectors.DefaultSelector()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_sessions,
+                                            thread_name_prefix='session')
+        # Screen sent to the callers refused
+        self._busy_screen = Terminal(None).encode(
+            Terminal.CLEAR_SCREEN,
+            [Terminal.CURSOR_MOVE, 0x40 | 12, 0x40 | ((COLUMNS - len(self.BUSY_MESSAGE)) // 2 + 1)],
+            encode_text(self.BUSY_MESSAGE))
+        self._sessions = set()
+        self._lock = Lock()
+
+    def get_sessions(self):
+        """ Gets the running sessions """
+        with self._lock:
+            return list(self._sessions)
+
+    def _listen(self, port):
+        logger.info("Listening for connection on port {}".format(port))
+        tcp_server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        tcp_server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.reuse_port:
+            tcp_server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        if SIMULATE_12000_BPS:
+            tcp_server.setsockopt(socket.SOL_TCP, socket.TCP_NODELAY, 1)
+        tcp_server.bind((TCP_IP, port))
+        tcp_server.listen()
+        tcp_server.setblocking(False)
+        self._selector.register(tcp_server, selectors.EVENT_READ, port)
+
+    def _accept(self, tcp_server, port):
+        try:
+            (conn, (ip, _port)) = tcp_server.accept()
+        except BlockingIOError:
+            return
+        logger.info("Got connection from {}".format(ip))
+        conn.setblocking(0)
+        with self._lock:
+            running = len(self._sessions)
+        if running >= self.max_sessions:
+            logger.warning("All {} sessions are running, call from {} refused".format(self.max_sessions, ip))
+            self._refuse(conn)
+            return
+        session = Session(ip, port, conn)
+        with self._lock:
+            self._sessions.add(session)
+        future = self._executor.submit(session.run)
+        future.add_done_callback(lambda f: self._session_done(session, f))
+
+    def _refuse(self, conn):
+        """ Tells a caller the server is busy and hangs up """
+        try:
+            conn.send(self._busy_screen)
+            conn.shutdown(socket.SHUT_WR)
+            # Unread input would reset the connection before the screen is received
+            conn.recv(4096)
+        except OSError:
+            pass
+        conn.close()
+
+    def _session_done(self, session, future):
+        with self._lock:
+            self._sessions.discard(session)
+        session.terminal.close()
+        error = future.exception()
+        if error is not None:
+            logger.error("Session of {} ended with error".format(session.ip), exc_info=error)
+        logger.debug("{} sessions running".format(len(self._sessions)))
+
+    def run(self):
+        for port in self.ports:
+            self._listen(port)
+        try:
+            while True:
+                for key, _mask in self._selector.select():
+                    self._accept(key.fileobj, key.data)
+        finally:
+            for key in list(self._selector.get_map().values()):
+                key.fileobj.close()
+            self._selector.close()
+            self._executor.shutdown(wait=False)
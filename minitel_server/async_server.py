@@ -0,0 +1,312 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+"""
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from minitel_server.async_terminal import AsyncTerminal, BlockingTerminal
+from minitel_server.configuration import Configuration
+from minitel_server.exceptions import DisconnectedError, \
+    UserTerminateSessionError
+from minitel_server.handlers import HandlerResolver
+from minitel_server.session_store import SessionStore, restore_forms
+from minitel_server.page import Page, PageContext, DefaultPageHandler
+from minitel_server.prefetcher import Prefetcher
+from minitel_server.screen import COLUMNS
+from minitel_server.trace import IOTrace
+
+TCP_IP = '0.0.0.0'
+logger = logging.getLogger('AsyncServer')
+
+
+class AsyncPageHandler(object):
+    """
+    Abstract page handler for custom handlers running on the event loop
+    Same as PageHandler but with coroutines
+    """
+    # Handlers using minitel.screen_update() set it, the terminal then follows the screen content
+    SCREEN_MODEL = False
+
+    def __init__(self, minitel, context):
+        self.minitel = minitel
+        self.context = context
+        self.forms = []
+
+    async def before_rendering(self):
+        """
+        Called before rendering the page
+        Useful for setting forms
+        """
+        pass
+
+    async def render(self):
+        """
+        Send the page content to the Minitel
+        """
+        pass
+
+    async def after_rendering(self):
+        """
+        Called after render() to handle keyboard inputs (or redirects)
+        """
+        return None
+
+    def get_next_pages(self):
+        """
+        Gets the names of the pages likely shown after this one
+        """
+        return ()
+
+
+class AsyncDefaultPageHandler(DefaultPageHandler):
+    """
+    Default page handler for simple pages described in YAML,
+    running on the event loop
+    """
+
+    async def before_rendering(self):
+        super().before_rendering()
+
+    async def render(self):
+        super().render()
+        await self.minitel.drain()
+
+    async def after_rendering(self):
+        if self.forms is not None:
+            # Wait for zones
+            await self.minitel.wait_form_inputs()
+            return self.match_actions()
+        sep, key = await self.minitel.wait_input()
+        return self.handle_key(sep, key)
+
+
+class SyncHandlerAdapter(object):
+    """
+    Runs a synchronous PageHandler in a worker thread
+    """
+
+    def __init__(self, handler_class, minitel, context, pool):
+        self._pool = pool
+        self.handler = handler_class(minitel, context)
+        self.SCREEN_MODEL = handler_class.SCREEN_MODEL
+
+    def _call(self, method):
+        try:
+            return method()
+        finally:
+            self.handler.minitel.flush()
+
+    async def _run(self, method):
+        return await self._pool.run(functools.partial(self._call, method))
+
+    async def before_rendering(self):
+        return await self._run(self.handler.before_rendering)
+
+    async def render(self):
+        return await self._run(self.handler.render)
+
+    async def after_rendering(self):
+        return await self._run(self.handler.after_rendering)
+
+    def get_next_pages(self):
+        return self.handler.get_next_pages()
+
+
+class HandlerPool(object):
+    """
+    Threads running the synchronous handlers
+    A synchronous handler holds a thread from its creation to the next page
+    (also while waiting for an input). Once all are held, callers opening a
+    synchronous page are shown a busy screen until a thread is free
+    """
+    BUSY_MESSAGE = "Serveur occupé, veuillez patienter"
+
+    def __init__(self, threads):
+        self.threads = threads
+        # Handlers holding or waiting for a thread (only changed on the event loop)
+        self.busy = 0
+        self._slots = asyncio.Semaphore(threads)
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='handler')
+
+    async def acquire(self, terminal):
+        """
+        Waits for a free thread, the caller of terminal is told the server is
+        busy meanwhile. release() must be called once the handler is done
+        """
+        self.busy += 1
+        try:
+            if self._slots.locked():
+                if self.busy == self.threads + 1:
+                    logger.warning("All {} synchronous handler threads are busy, "
+                                   "callers wait for a free thread".format(self.threads))
+                terminal.clear_screen()
+                terminal.move_cursor((COLUMNS - len(self.BUSY_MESSAGE)) // 2 + 1, 12)
+                terminal.print_text(self.BUSY_MESSAGE)
+                await terminal.drain()
+                await self._slots.acquire()
+                terminal.clear_screen()
+            else:
+                await self._slots.acquire()
+        except BaseException:
+            self.busy -= 1
+            raise
+
+    def release(self):
+        """ Gives back a thread taken by acquire() """
+        self._slots.release()
+        self.busy -= 1
+
+    async def run(self, function):
+        """ Runs function in a thread of the pool, the handler must hold a thread """
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+class AsyncSession(object):
+    """
+    A Session of Minitel running on the event loop
+    """
+
+    def __init__(self, ip, port, reader, writer, pool):
+        """
+        Constructor
+        """
+        self.ip = ip
+        self.port = port
+        self.terminal = AsyncTerminal(reader, writer, IOTrace.create(ip, port))
+        self.context = None
+        self._pool = pool
+        # Terminal of the synchronous handlers, shares the state of the asynchronous one
+        self._blocking_terminal = BlockingTerminal(self.terminal, asyncio.get_running_loop())
+        logger.info("Starting a new Minitel Session "
+                    "for IP {ip} on service {port}".
+                    format(ip=self.ip, port=self.port))
+
+    async def get_handler(self):
+        """ Creates the handler of the current page """
+        page = self.context.current_page
+        resolver = HandlerResolver.get_instance()
+        if resolver.is_imported(page):
+            class_ = resolver.resolve(page, use_asyncio=True)
+        else:
+            # Imports run in a thread, the other sessions go on
+            class_ = await asyncio.get_running_loop().run_in_executor(None, resolver.resolve, page, True)
+        if class_ is None:
+            logger.debug("Using default handler")
+            return AsyncDefaultPageHandler(self.terminal, self.context)
+        if issubclass(class_, (AsyncPageHandler, AsyncDefaultPageHandler)):
+            return class_(self.terminal, self.context)
+        # Synchronous handler, runs it in a thread held until the next page
+        await self._pool.acquire(self.terminal)
+        try:
+            return SyncHandlerAdapter(class_, self._blocking_terminal, self.context, self._pool)
+        except BaseException:
+            self._pool.release()
+            raise
+
+    async def run(self):
+        try:
+            logger.debug("Minitel session started")
+            self.terminal.clear_screen()
+            self.terminal.home_cursor()
+
+            ''' Loads the root page and create the default context '''
+            forms = None
+            # The store may read and write files, not done on the event loop
+            loop = asyncio.get_running_loop()
+            resumed = await loop.run_in_executor(None, SessionStore.get_instance().resume, self.ip, self.port)
+            if resumed is not None:
+                self.context, forms = resumed
+            else:
+                page = Page.get_page(self.port, None)
+                self.context = PageContext(None, page)
+            while True:
+                handler = await self.get_handler()
+                try:
+                    self.terminal.use_screen_model(handler.SCREEN_MODEL)
+                    Prefetcher.get_instance().visit(self.context.current_page, handler)
+                    await handler.before_rendering()
+                    if forms is not None:
+                        restore_forms(self.terminal, forms)
+                        forms = None
+                    await handler.render()
+                    new_context = await handler.after_rendering()
+                finally:
+                    if isinstance(handler, SyncHandlerAdapter):
+                        self._pool.release()
+                if new_context is not None:
+                    self.context = new_context
+
+        except DisconnectedError:
+            logger.info("IP {} disconnected".format(self.ip))
+            await asyncio.get_running_loop().run_in_executor(None, SessionStore.get_instance().save,
+                                                             self.ip, self.port, self.context, self.terminal)
+        except UserTerminateSessionError:
+            logger.info("User {} disconnection request".format(self.ip))
+        finally:
+            self.terminal.close()
+            self.report()
+
+    def report(self):
+        """ Logs the memory used by the navigation history """
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        if self.context is not None:
+            report = self.context.memory_report()
+            logger.debug("IP %s kept %d page context(s), %d bytes", self.ip, report['contexts'], report['size'])
+        logger.debug("Prefetcher %s", Prefetcher.get_instance().stats())
+
+
+class AsyncServer(object):
+    """
+    Listen for TCP connections on all service ports with a single event loop
+    """
+
+    def __init__(self, ports, sync_handler_threads=None, reuse_port=False):
+        """
+        Constructor
+        sync_handler_threads : Maximum number of synchronous handlers running
+        at the same time (default from configuration)
+        """
+        self.ports = ports
+        self.reuse_port = reuse_port
+        self.sync_handler_threads = sync_handler_threads or Configuration.sync_handler_threads
+        # Made on the event loop by serve()
+        self._pool = None
+        self.sessions = set()
+
+    async def _on_connection(self, port, reader, writer):
+        ip = writer.get_extra_info('peername')[0]
+        logger.info("Got connection from {}".format(ip))
+        session = AsyncSession(ip, port, reader, writer, self._pool)
+        self.sessions.add(session)
+        try:
+            await session.run()
+        finally:
+            self.sessions.discard(session)
+
+    async def serve(self):
+        self._pool = HandlerPool(self.sync_handler_threads)
+        servers = []
+        for port in self.ports:
+            logger.info("Listening for connection on port {}".format(port))
+            servers.append(await asyncio.start_server(functools.partial(self._on_connection, port),
+                                                      TCP_IP, port, reuse_address=True,
+                                                      reuse_port=self.reuse_port or None))
+        await asyncio.gather(*(s.serve_forever() for s in servers))
+
+    def run(self):
+        """
+        Runs the event loop until interrupted
+        """
+        try:
+            asyncio.run(self.serve())
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
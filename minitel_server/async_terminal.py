@@ -0,0 +1,368 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+"""
+
+import asyncio
+import functools
+import logging
+
+from minitel_server.constant import SIMULATE_12000_BPS
+from minitel_server.exceptions import DisconnectedError, MinitelTimeoutError
+from minitel_server.pacer import BaudPacer, bytes_per_second
+from minitel_server.terminal import Terminal
+from minitel_server.trace import OUTPUT
+
+logger = logging.getLogger('AsyncTerminal')
+
+
+class _Drain(object):
+    """
+    Awaitable returned by AsyncTerminal.write
+    Awaiting it sends the pending output, ignoring it keeps the output
+    buffered until the next read or drain
+    """
+    __slots__ = ('_terminal',)
+
+    def __init__(self, terminal):
+        self._terminal = terminal
+
+    def __await__(self):
+        return self._terminal.drain().__await__()
+
+
+class AsyncTerminal(Terminal):
+    """
+    Minitel terminal control running on an asyncio event loop
+    All output helpers of Terminal are buffered, the buffer is sent
+    when a write is awaited or before waiting for an input
+    """
+    def __init__(self, reader, writer, trace=None):
+        """
+        Terminal constructor using asyncio streams
+        """
+        super().__init__(None, trace=trace)
+        self._reader = reader
+        self._writer = writer
+        # Bundled files to send, (position in the output, bundle, offset, wire bytes)
+        self._files = []
+        self._use_sendfile = self.SENDFILE
+
+    def write(self, *data):
+        """
+        Buffers data to be sent, the result can be awaited to send it
+        """
+        super().write(*data)
+        return _Drain(self)
+
+    def flush(self):
+        """
+        Output is sent by drain() on the event loop
+        """
+        pass
+
+    async def send(self, bytes_data):
+        """
+        Sends already encoded bytes to the Minitel
+        """
+        self._output += bytes_data
+        await self.drain()
+
+    async def send_file(self, bundle, offset, wire):
+        """
+        Sends the wire bytes of a bundled page file (see Terminal._queue_file)
+        """
+        self._queue_file(bundle, offset, wire)
+        await self.drain()
+
+    def _queue_file(self, bundle, offset, wire):
+        """
+        The file is sent by drain() after the output buffered before
+        """
+        self._files.append((len(self._output), bundle, offset, wire))
+
+    async def drain(self):
+        """
+        Sends all the buffered output
+        """
+        self._commit_update()
+        if not self._output and not self._files:
+            return
+        bytes_data = bytes(self._output)
+        self._output.clear()
+        files = self._files
+        self._files = []
+        if self._trace is not None:
+            self._trace.record(OUTPUT, bytes_data)
+        try:
+            start = 0
+            for position, bundle, offset, wire in files:
+                await self._send_paced(position - start, functools.partial(self._write, bytes_data[start:position]))
+                await self._send_paced(len(wire), functools.partial(self._write_file, bundle, offset, wire))
+                start = position
+            await self._send_paced(len(bytes_data) - start, functools.partial(self._write, bytes_data[start:]))
+        except (ConnectionError, OSError):
+            raise DisconnectedError()
+
+    async def _send_paced(self, count, send):
+        """
+        Sends count bytes with send(start, end), by chunks at the simulated speed
+        """
+        if not count:
+            return
+        if not SIMULATE_12000_BPS:
+            await send(0, count)
+            return
+        # Sends a chunk per pacer tick, deadlines follow the loop clock
+        loop = asyncio.get_running_loop()
+        rate = bytes_per_second(self.baud_rate)
+        chunk_size = max(int(rate * BaudPacer.TICK), 1)
+        start = loop.time()
+        for i in range(0, count, chunk_size):
+            sent = min(i + chunk_size, count)
+            await send(i, sent)
+            await asyncio.sleep(max(start + sent / rate - loop.time(), 0))
+
+    async def _write(self, data, start, end):
+        self._writer.write(data[start:end])
+        await self._writer.drain()
+
+    async def _write_file(self, bundle, offset, wire, start, end):
+        if self._use_sendfile:
+            try:
+                await asyncio.get_running_loop().sendfile(self._writer.transport, bundle.get_file(),
+                                                          offset + start, end - start, fallback=False)
+                return
+            except (asyncio.SendfileNotAvailableError, RuntimeError):
+                # Not supported by the transport, the mapped bytes are written
+                self._use_sendfile = False
+        await self._write(wire, start, end)
+
+    async def read(self, timeout=None):
+        """
+        Reads a single byte from the receive buffer
+        """
+        if not self._input:
+            await self._fill(timeout)
+        data = self._input[0]
+        del self._input[0]
+        return data
+
+    async def _fill(self, timeout=None):
+        """
+        Waits for data and receives everything available
+        """
+        await self.drain()
+        try:
+            data = await asyncio.wait_for(self._reader.read(self.RECV_SIZE), timeout)
+        except asyncio.TimeoutError:
+            raise MinitelTimeoutError()
+        except ConnectionError:
+            raise DisconnectedError
+        if not data:
+            raise DisconnectedError
+        self._received(data)
+
+    async def read_n(self, expected=1, timeout=None):
+        """
+        Reads a given amount of data
+        """
+        while len(self._input) < expected:
+            await self._fill(timeout)
+        data = list(self._input[:expected])
+        del self._input[:expected]
+        return data
+
+    async def read_all(self, timeout=0):
+        """
+        Reads all bytes in the receipt buffer
+        Mainly use to flush
+        """
+        try:
+            while True:
+                if not self._input:
+                    await self._fill(timeout)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Garbage data %s", bytes(self._input))
+                self._input.clear()
+                self._events.clear()
+                self._decoder.reset()
+                timeout = 0.2
+        except MinitelTimeoutError:
+            pass
+
+    async def _drop_sequence(self):
+        """
+        Drops the input until the Minitel stops sending (see Terminal._drop_sequence)
+        """
+        try:
+            while True:
+                if not self._input:
+                    await self._fill(0.2)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Garbage data %s", bytes(self._input))
+                self._input.clear()
+        except MinitelTimeoutError:
+            pass
+        self._decoder.reset()
+
+    async def wait_connection(self):
+        """
+        Waits for connection garbage CHARACTERS
+        """
+        logger.debug("Waiting for connection data...")
+        try:
+            while True:
+                await self._fill(self.CONN_TIMEOUT / 1000)
+                self._input.clear()
+        except MinitelTimeoutError:
+            pass
+
+    async def wait_input(self, timeout=None):
+        """
+        Waits for user input
+        """
+        if self._first_read:
+            logger.info("Clearing first read garbage data")
+            try:
+                await self.read(0.1)
+                await self.read_all(timeout=5)
+            except MinitelTimeoutError:
+                pass
+            self._first_read = False
+
+        while not self._events:
+            if not self._input:
+                await self._fill(timeout)
+            self._events.extend(self._decoder.feed(self._input))
+            self._input.clear()
+            if self._decoder.discarding:
+                await self._drop_sequence()
+        return self._events.popleft()
+
+    async def wait_form_inputs(self, timeout=None, move_cursor=True, force_form=None, current_form=0):
+        """
+        Waits for user inputs to be filled
+        """
+        if force_form is None:
+            for f in self.forms:
+                f.prepare(self)
+            self.current_form = current_form
+            while True:
+                key = await self.grab_focus(self.forms[self.current_form], timeout, move_cursor)
+                if key == self.SUITE:
+                    self.current_form += 1
+                    if self.current_form >= len(self.forms):
+                        self.current_form = 0
+                    logger.debug("Moving to next form input : %d", self.current_form)
+                else:
+                    return key
+        else:
+            logger.debug("Using form[%d] only", force_form)
+            self.forms[force_form].prepare(self)
+            return await self.grab_focus(self.forms[self.current_form], timeout, move_cursor)
+
+    async def grab_focus(self, form_input, timeout=None, move_cursor=True):
+        """
+        Manage a form input (see FormInput.grab_focus)
+        """
+        if move_cursor:
+            form_input.focus(self)
+        while True:
+            sep, key = await self.wait_input(timeout)
+            key = form_input.handle_input(self, sep, key)
+            if key is not None:
+                return key
+
+    async def show_message(self, text, duration=2, x=1, y=0, reverse=False):
+        """
+        Displays a notification message on top left of screen
+        User must move back the cursor to continue (and put it visible)
+        """
+        self.visible_cursor(False)
+        self.move_cursor(x, y)
+        if reverse:
+            self.reverse_video()
+        self.print_text(text)
+        await self.drain()
+        await asyncio.sleep(duration)
+        self.move_cursor(x, y)
+        if reverse:
+            self.normal_video()
+        self.print_repeat(' ', len(text))
+        await self.drain()
+
+    def close(self):
+        """
+        Closes the stream
+        """
+        self._report()
+        if self._trace is not None:
+            self._trace.close()
+        self._writer.close()
+
+
+class BlockingTerminal(Terminal):
+    """
+    Blocking terminal used by synchronous page handlers running in a
+    worker thread. All I/O is delegated to an AsyncTerminal on its loop
+    """
+
+    def __init__(self, terminal, loop):
+        # Set first, the shared state set by Terminal goes to the asynchronous terminal
+        # (created with it, so both have their initial state)
+        self._terminal = terminal
+        super().__init__(None)
+        self._loop = loop
+        # Forms, screen and input state are shared with the asynchronous terminal
+        self.forms = terminal.forms
+        self._input = terminal._input
+        self._decoder = terminal._decoder
+        self._events = terminal._events
+
+    @property
+    def _first_read(self):
+        return self._terminal._first_read
+
+    @_first_read.setter
+    def _first_read(self, value):
+        self._terminal._first_read = value
+
+    @property
+    def state(self):
+        return self._terminal.state
+
+    @state.setter
+    def state(self, value):
+        self._terminal.state = value
+
+    @property
+    def screen(self):
+        return self._terminal.screen
+
+    @screen.setter
+    def screen(self, value):
+        self._terminal.screen = value
+
+    @property
+    def saved_bytes(self):
+        return self._terminal.saved_bytes
+
+    @saved_bytes.setter
+    def saved_bytes(self, value):
+        self._terminal.saved_bytes = value
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def _send(self, bytes_data):
+        self._call(self._terminal.send(bytes(bytes_data)))
+
+    def _fill(self, timeout=None):
+        self.flush()
+        self._call(self._terminal._fill(timeout))
+
+    def _queue_file(self, bundle, offset, wire):
+        self.flush()
+        self._call(self._terminal.send_file(bundle, offset, wire))
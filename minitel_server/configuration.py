@@ -9,13 +9,28 @@ import sys
 import os
 
 from . import constant
+from .pacer import BAUD_RATES
 
 logger = logging.getLogger('page')
 
 
 class Configuration(object):
     PAGE_LOCATION = 'pages'
+    DEFAULT_BAUD_RATE = 1200
     page_folder = '.'
+    baud_rate = DEFAULT_BAUD_RATE
+    trace_folder = None
+    latency_budget = None
+    content_cache_size = 8 * 1024 * 1024
+    warm_up = True
+    watch_pages = False
+    navigation_depth = 32
+    resume_grace = 0
+    session_folder = None
+    page_bundle = None
+    prefetch_size = 1024 * 1024
+    sync_handler_threads = 256
+    max_sessions = 1024
 
     @staticmethod
     def load_configuration():
@@ -29,6 +44,39 @@ class Configuration(object):
                 if page_folder is not None:
                     Configuration.page_folder = page_folder
                     sys.path.append(page_folder)
+                # Gets simulated modem speed
+                Configuration.baud_rate = int(data.get('baud_rate', Configuration.baud_rate))
+                if Configuration.baud_rate not in BAUD_RATES:
+                    logger.warning("Unsupported baud_rate {} (supported: {}), using {}".format(
+                        Configuration.baud_rate, ', '.join(str(b) for b in BAUD_RATES),
+                        Configuration.DEFAULT_BAUD_RATE))
+                    Configuration.baud_rate = Configuration.DEFAULT_BAUD_RATE
+                # Gets binary I/O traces location (disabled if not set)
+                Configuration.trace_folder = data.get('trace_folder', None)
+                # Gets default maximum page transmission time (seconds)
+                Configuration.latency_budget = data.get('latency_budget', None)
+                # Gets the maximum size of page files kept in memory (bytes)
+                Configuration.content_cache_size = int(data.get('content_cache_size',
+                                                                Configuration.content_cache_size))
+                # Imports all page handlers before serving
+                Configuration.warm_up = bool(data.get('warm_up', Configuration.warm_up))
+                # Reloads changed pages and handlers while serving
+                Configuration.watch_pages = bool(data.get('watch_pages', Configuration.watch_pages))
+                # Gets the number of pages a user can go back to with RETOUR
+                Configuration.navigation_depth = int(data.get('navigation_depth', Configuration.navigation_depth))
+                # Gets the seconds a dropped session can be resumed (disabled if 0)
+                Configuration.resume_grace = float(data.get('resume_grace', Configuration.resume_grace))
+                # Gets the folder of dropped sessions (kept in memory if not set)
+                Configuration.session_folder = data.get('session_folder', None)
+                # Gets the page bundle served instead of the pages folder (python -m minitel_server.page_bundle)
+                Configuration.page_bundle = data.get('page_bundle', None)
+                # Gets the maximum size of next pages loaded in advance (bytes, disabled if 0)
+                Configuration.prefetch_size = int(data.get('prefetch_size', Configuration.prefetch_size))
+                # Gets the number of threads running synchronous handlers with --asyncio
+                Configuration.sync_handler_threads = int(data.get('sync_handler_threads',
+                                                                  Configuration.sync_handler_threads))
+                # Gets the maximum number of sessions running at the same time without --asyncio
+                Configuration.max_sessions = int(data.get('max_sessions', Configuration.max_sessions))
         except FileNotFoundError:
             logger.warning("Configuration file not found.")
 
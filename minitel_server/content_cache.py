@@ -0,0 +1,116 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+
+Process wide cache of page files in their wire form
+"""
+import logging
+import os
+from collections import OrderedDict, namedtuple
+from threading import Lock
+
+from minitel_server.configuration import Configuration
+from minitel_server.constant import PROCESS_PARITY
+from minitel_server.encoding import add_even_parity, compress_repeats
+from minitel_server.screen import screen_after_clear
+from minitel_server.vdt_optimizer import optimize
+
+logger = logging.getLogger('ContentCache')
+
+_instance_lock = Lock()
+
+# data is the Videotex stream (without parity) and wire the bytes to send
+# screen is the Screen left by data when it starts with FF (see Screen.replay)
+Content = namedtuple('Content', ['mtime', 'data', 'wire', 'screen'])
+
+
+def encode_content(data, optimize_files=True):
+    """
+    Gets the (Videotex stream, wire bytes) of the content of a page file
+    """
+    if optimize_files:
+        data = optimize(data)
+    wire = compress_repeats(data)
+    if PROCESS_PARITY:
+        wire = add_even_parity(wire)
+    return data, bytes(wire)
+
+
+class ContentCache(object):
+    """
+    LRU cache of page files, bounded by the size of the cached bytes
+    An entry is reloaded when its file modification time changes
+    """
+    _instance = None
+
+    def __init__(self, max_size, optimize_files=True):
+        self.max_size = max_size
+        self.optimize_files = optimize_files
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def get_instance():
+        """ Gets the process wide cache """
+        with _instance_lock:
+            if ContentCache._instance is None:
+                ContentCache._instance = ContentCache(Configuration.content_cache_size)
+            return ContentCache._instance
+
+    def get(self, filename):
+        """
+        Gets the Content of a file
+        """
+        mtime = os.stat(filename).st_mtime_ns
+        with self._lock:
+            content = self._entries.get(filename)
+            if content is not None and content.mtime == mtime:
+                self._entries.move_to_end(filename)
+                self.hits += 1
+                return content
+            self.misses += 1
+        content = self._load(filename, mtime)
+        with self._lock:
+            previous = self._entries.pop(filename, None)
+            if previous is not None:
+                self.size -= len(previous.data) + len(previous.wire)
+            self._entries[filename] = content
+            self.size += len(content.data) + len(content.wire)
+            while self.size > self.max_size and len(self._entries) > 1:
+                _name, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted.data) + len(evicted.wire)
+        return content
+
+    def _load(self, filename, mtime):
+        logger.debug("Loading %s", filename)
+        with open(filename, 'rb') as f:
+            data, wire = encode_content(f.read(), self.optimize_files)
+        return Content(mtime, data, wire, screen_after_clear(data))
+
+    def contains(self, filename):
+        """ Tells if a file is cached """
+        with self._lock:
+            return filename in self._entries
+
+    def discard(self, filename):
+        """ Drops the entry of a file """
+        with self._lock:
+            content = self._entries.pop(filename, None)
+            if content is not None:
+                self.size -= len(content.data) + len(content.wire)
+
+    def clear(self):
+        """ Drops all entries """
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        """ Gets the cache counters """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'entries': len(self._entries), 'size': self.size}
@@ -0,0 +1,148 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+"""
+import logging
+import unicodedata
+from collections import namedtuple
+
+from minitel_server.encoding import G2_CHARACTERS, G2_DIACRITICS
+
+logger = logging.getLogger('Decoder')
+
+# Decoded input
+# sep is True for a function key (key is Terminal.ENVOI...)
+# sep is False for a character (key is the G0 code or the G2 character string)
+InputEvent = namedtuple('InputEvent', ['sep', 'key'])
+
+SEP = 0x13
+ESC = 0x1B
+SS2 = 0x19
+
+# SEP second byte to function key, other values are acknowledges
+SEP_KEYS = {0x40 + key: key for key in range(1, 10)}
+
+# Protocol acknowledges (ESC PROx) with the number of bytes following
+PROTOCOL_LENGTHS = {
+    0x39: 1,  # PRO1
+    0x3A: 2,  # PRO2
+    0x3B: 3,  # PRO3
+}
+
+# G2 code to character
+G2_INPUT = {code: char for char, code in G2_CHARACTERS.items() if not char.isascii()}
+G2_INPUT[0x31] = '±'
+
+# (G2 diacritic, G0 letter) to accented character
+DIACRITIC_INPUT = {}
+for _mark, _code in G2_DIACRITICS.items():
+    for _letter in range(0x41, 0x7B):
+        _char = unicodedata.normalize('NFC', chr(_letter) + _mark)
+        if len(_char) == 1:
+            DIACRITIC_INPUT[(_code, _letter)] = _char
+
+# Decoder states
+_IDLE = 0
+_SEP = 1
+_ESC = 2
+_PROTOCOL = 3
+_G2 = 4
+_DIACRITIC = 5
+_DISCARD = 6
+
+
+class InputDecoder(object):
+    """
+    Incremental Minitel keyboard decoder
+    Bytes (parity removed) can be fed in any chunking
+    After an unsupported sequence every byte is discarded until reset()
+    """
+
+    def __init__(self):
+        self._state = _IDLE
+        self._remaining = 0
+        self._diacritic = 0
+        self._handlers = (self._idle, self._sep, self._esc, self._protocol,
+                          self._g2, self._diacritic_letter, self._discard)
+
+    def reset(self):
+        """ Drops any partially decoded sequence """
+        self._state = _IDLE
+
+    @property
+    def discarding(self):
+        """ Tells if an unsupported sequence is being discarded """
+        return self._state == _DISCARD
+
+    def feed(self, data):
+        """
+        Decodes bytes, returns the list of complete InputEvent
+        """
+        events = []
+        handlers = self._handlers
+        for b in data:
+            event = handlers[self._state](b)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def _idle(self, b):
+        if 0x20 <= b <= 0x7F:
+            return InputEvent(False, b)
+        if b == SEP:
+            self._state = _SEP
+        elif b == ESC:
+            self._state = _ESC
+        elif b == SS2:
+            self._state = _G2
+        else:
+            logger.error("Got out of range character :0x%x", b)
+        return None
+
+    def _sep(self, b):
+        self._state = _IDLE
+        key = SEP_KEYS.get(b)
+        if key is None:
+            logger.debug("SEP is an acknowledge")
+            return None
+        return InputEvent(True, key)
+
+    def _esc(self, b):
+        length = PROTOCOL_LENGTHS.get(b)
+        if length is None:
+            # Its length is unknown, drops the input until reset
+            logger.warning("unsupported protocol ack.")
+            self._state = _DISCARD
+        else:
+            self._remaining = length
+            self._state = _PROTOCOL
+        return None
+
+    def _protocol(self, _b):
+        self._remaining -= 1
+        if self._remaining == 0:
+            self._state = _IDLE
+        return None
+
+    def _g2(self, b):
+        char = G2_INPUT.get(b)
+        if char is not None:
+            self._state = _IDLE
+            return InputEvent(False, char)
+        if b in G2_DIACRITICS.values():
+            self._diacritic = b
+            self._state = _DIACRITIC
+        else:
+            self._state = _IDLE
+        return None
+
+    def _diacritic_letter(self, b):
+        self._state = _IDLE
+        char = DIACRITIC_INPUT.get((self._diacritic, b))
+        if char is None:
+            return InputEvent(False, b)
+        return InputEvent(False, char)
+
+    def _discard(self, _b):
+        return None
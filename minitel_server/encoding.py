@@ -0,0 +1,152 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+# Single shift 2, next byte is taken from the G2 set
+SS2 = '\x19'
+
+# G2 characters, the ASCII ones are also available in G0
+G2_CHARACTERS = {
+    '£': 0x23, '$': 0x24, '#': 0x26, '§': 0x27,
+    '←': 0x2C, '↑': 0x2D, '→': 0x2E, '↓': 0x2F,
+    '°': 0x30, '±': 0x31, '÷': 0x38,
+    '¼': 0x3C, '½': 0x3D, '¾': 0x3E,
+    'Œ': 0x6A, 'œ': 0x7A, 'ß': 0x7B,
+}
+
+# G2 diacritics (combining character: G2 code), followed by the G0 letter
+G2_DIACRITICS = {
+    '\u0300': 0x41,  # Grave
+    '\u0301': 0x42,  # Acute
+    '\u0302': 0x43,  # Circumflex
+    '\u0308': 0x48,  # Diaeresis
+    '\u0327': 0x4B,  # Cedilla
+}
+
+# Characters without Videotex equivalent
+SUBSTITUTES = {
+    '\u0336': '\x60',  # Long stroke overlay is the G0 horizontal bar
+    '«': '"', '»': '"', '“': '"', '”': '"', '„': '"',
+    '‘': "'", '’': "'", '´': "'",
+    '–': '-', '—': '-', '…': '...', '\xa0': ' ',
+    'æ': 'ae', 'Æ': 'AE', 'ø': 'o', 'Ø': 'O', '×': 'x',
+}
+
+# Code points covered by the encoding table
+_TABLE_RANGE = range(0xA0, 0x250)
+
+# Maximum number of strings kept by encode_text
+TEXT_CACHE_SIZE = 1024
+
+
+def _build_videotex_table():
+    """
+    Builds the str.translate table converting text to G0/G2 sequences
+    Accented lowercase letters use G2 diacritics, the Minitel has no
+    accented uppercase letters so the accent is dropped
+    """
+    table = {}
+    for code in _TABLE_RANGE:
+        decomposed = unicodedata.normalize('NFD', chr(code))
+        base, marks = decomposed[0], decomposed[1:]
+        if not marks or not base.isascii() or not base.isalpha():
+            continue
+        if base.islower() and marks in G2_DIACRITICS:
+            table[code] = SS2 + chr(G2_DIACRITICS[marks]) + base
+        else:
+            table[code] = base
+    for char, code in G2_CHARACTERS.items():
+        if not char.isascii():
+            table[ord(char)] = SS2 + chr(code)
+    for char, substitute in SUBSTITUTES.items():
+        table[ord(char)] = substitute
+    return table
+
+
+VIDEOTEX_TABLE = _build_videotex_table()
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def encode_text(text):
+    """
+    Encodes a text to Videotex bytes (without parity) in a single pass
+    Characters without equivalent are replaced by '?'
+    """
+    return text.translate(VIDEOTEX_TABLE).encode('ascii', 'replace')
+
+
+def _even_parity(b):
+    """ Gets the byte with its even parity bit (bit 7) set """
+    if bin(b).count('1') % 2:
+        b |= 0x80
+    return b
+
+
+# Translation tables to be used with bytes.translate
+PARITY_TABLE = bytes(_even_parity(b) for b in range(256))
+STRIP_PARITY_TABLE = bytes(b & 0x7f for b in range(256))
+
+
+def add_even_parity(data):
+    """
+    Add even parity to bytes
+    """
+    return data.translate(PARITY_TABLE)
+
+
+def remove_parity(data):
+    """
+    Removes parity bit
+    """
+    return data.translate(STRIP_PARITY_TABLE)
+
+
+# REP repeats the last character 1 to 63 times
+REP = 0x12
+MAX_REPEAT = 63
+
+# Sequences which parameters must be kept as is and runs of at least 4
+# identical characters (shorter runs are not worth a REP)
+_REPEAT_TOKENS = re.compile(rb"""
+      \x1b\x5b[\x30-\x3f]*[\x20-\x2f]*[\x40-\x7e]?  # CSI
+    | \x1b\x39.? | \x1b\x3a.{0,2} | \x1b\x3b.{0,3}  # PRO1, PRO2, PRO3
+    | \x1b[\x20-\x2f]+.?                             # Designations
+    | \x1b.?                                         # Attributes
+    | \x1f[\x30-\x39]+ | \x1f.{0,2}                  # Positioning, all decimal digits
+    | [\x16\x19][\x41\x42\x43\x48\x4b].? | [\x16\x19].?  # G2 characters
+    | [\x12\x13].?                                   # REP and SEP
+    | ([\x20-\x7f])\1{3,}                            # Run
+""", re.S | re.X)
+# Start of a DRCS download, its data can't be compressed
+_DRCS = b'\x1f\x23'
+
+
+def _repeat(match):
+    run = match.group(0)
+    if match.group(1) is None:
+        return run
+    out = bytearray(run[:1])
+    count = len(run) - 1
+    while count > 0:
+        n = min(count, MAX_REPEAT)
+        if n < 3:
+            out += run[:n]
+        else:
+            out += bytes((REP, 0x40 | n))
+        count -= n
+    return bytes(out)
+
+
+def compress_repeats(data):
+    """
+    Replaces runs of identical characters (without parity) by REP sequences
+    Sequence parameters and G2 characters are never compressed
+    """
+    if len(data) < 4 or _DRCS in data:
+        return data
+    return _REPEAT_TOKENS.sub(_repeat, data)
@@ -0,0 +1,145 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+
+Resolves the custom handler classes of pages
+Classes are imported once and kept by module and class name, the
+warm-up imports all handlers and loads all page files before serving
+"""
+import importlib
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from minitel_server.content_cache import ContentCache
+from minitel_server.page import Page
+from minitel_server.page_bundle import PageBundle
+
+logger = logging.getLogger('Handlers')
+
+_instance_lock = Lock()
+
+
+class HandlerResolver(object):
+    """
+    Cache of page handler classes
+    """
+    # Threads importing handlers during the warm-up
+    WARM_UP_THREADS = 8
+    # Prefix of the class used by the asyncio server when the module defines it
+    ASYNC_PREFIX = 'Async'
+    _instance = None
+
+    def __init__(self):
+        # Handler class by (module name, class name, asyncio server)
+        self._classes = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def get_instance():
+        """ Gets the process wide resolver """
+        with _instance_lock:
+            if HandlerResolver._instance is None:
+                HandlerResolver._instance = HandlerResolver()
+            return HandlerResolver._instance
+
+    def resolve(self, page, use_asyncio=False):
+        """
+        Gets the handler class of a page, None for the default handler
+        With use_asyncio, Async<handler> is used when the module defines it
+        """
+        handler_name = page.get_handler()
+        if handler_name is None:
+            return None
+        key = (page.get_module_name(), handler_name, use_asyncio)
+        class_ = self._classes.get(key)
+        if class_ is None:
+            module = importlib.import_module(key[0])
+            class_ = getattr(module, handler_name)
+            if use_asyncio:
+                class_ = getattr(module, self.ASYNC_PREFIX + handler_name, class_)
+            with self._lock:
+                self._classes[key] = class_
+        return class_
+
+    def is_imported(self, page):
+        """ Tells if resolve() runs without importing a module """
+        return page.get_handler() is None or page.get_module_name() in sys.modules
+
+    def reload(self, module_name):
+        """
+        Imports a new version of a module if it was loaded, handlers already
+        running keep the old one. The old version stays if the new one fails
+        Modules holding state shared by sessions set HOT_RELOAD = False and
+        are not reloaded. Modules importing the reloaded one keep the old
+        version (page modules don't import each other)
+        Returns True if the module was reloaded
+        """
+        with self._lock:
+            old = sys.modules.get(module_name)
+            if old is None:
+                return False
+            if not getattr(old, 'HOT_RELOAD', True):
+                logger.warning("{} holds shared state and is not reloaded, "
+                               "restart the server to apply the change".format(module_name))
+                return False
+            del sys.modules[module_name]
+            importlib.invalidate_caches()
+            try:
+                importlib.import_module(module_name)
+            except Exception:
+                logger.exception("Can't reload {}, keeping the running version".format(module_name))
+                sys.modules[module_name] = old
+                return False
+            for key in [key for key in self._classes if key[0] == module_name]:
+                del self._classes[key]
+        logger.info("Module {} reloaded".format(module_name))
+        return True
+
+    def clear(self):
+        """ Forgets all resolved classes """
+        with self._lock:
+            self._classes.clear()
+
+    def warm_up(self, services, threads=WARM_UP_THREADS):
+        """
+        Imports the handlers and caches the files of all pages of the services
+        Returns the list of (service, page name, exception) that failed
+        """
+        pages = []
+        failures = []
+        bundle = PageBundle.get_instance()
+        for service in services:
+            names = bundle.get_page_names(service) if bundle is not None else None
+            for name in names if names is not None else Page.walk_pages(service):
+                try:
+                    page = Page.get_page(service, name)
+                except Exception as e:
+                    failures.append((service, name, e))
+                    continue
+                pages.append((service, name, page))
+
+        def load(item):
+            page = item[2]
+            try:
+                self.resolve(page)
+                data_file = page.get_page_data()
+                if data_file is not None and (bundle is None or bundle.get_content(data_file) is None):
+                    ContentCache.get_instance().get(data_file)
+            except Exception as e:
+                return e
+            return None
+
+        loaded = 0
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='warm-up') as executor:
+            for (service, name, _page), error in zip(pages, executor.map(load, pages)):
+                if error is None:
+                    loaded += 1
+                else:
+                    failures.append((service, name, error))
+        for service, name, error in failures:
+            logger.error("Page {} of service {} can't be loaded: {!r}".format(name or '(root)', service, error))
+        logger.info("{} page(s) loaded, {} failure(s)".format(loaded, len(failures)))
+        return failures
@@ -0,0 +1,194 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+"""
+import logging
+import os
+import time
+from threading import Thread, Condition, Lock
+
+from minitel_server.exceptions import DisconnectedError
+
+logger = logging.getLogger('Pacer')
+
+# Supported Minitel modem speeds
+BAUD_RATES = (75, 1200, 4800, 9600)
+# Bits per transmitted character (start + 7 data + parity + stop)
+BITS_PER_CHAR = 10
+
+_instance_lock = Lock()
+
+
+def bytes_per_second(baud_rate):
+    """ Gets the number of characters per second for a baud rate """
+    return baud_rate / BITS_PER_CHAR
+
+
+class PacedConnection(object):
+    """
+    Socket output limited to a baud rate by a token bucket
+    Bytes are sent by the shared BaudPacer timer
+    """
+
+    def __init__(self, pacer, con, baud_rate):
+        self._pacer = pacer
+        self.con = con
+        self._pending = bytearray()
+        # (file descriptor, offset, count) sent after the pending bytes
+        self._file = None
+        self._tokens = 0.0
+        self._last = time.monotonic()
+        self._error = None
+        self._drained = Condition(pacer.lock)
+        self.baud_rate = baud_rate
+
+    @property
+    def baud_rate(self):
+        return self._baud_rate
+
+    @baud_rate.setter
+    def baud_rate(self, baud_rate):
+        if baud_rate not in BAUD_RATES:
+            raise ValueError("Unsupported baud rate {}".format(baud_rate))
+        self._baud_rate = baud_rate
+        self._rate = bytes_per_second(baud_rate)
+
+    def send(self, data, wait=True):
+        """
+        Queues data to be sent
+        wait : Blocks until all queued data is sent
+        """
+        with self._pacer.lock:
+            # Bytes queued after a file segment are sent once it is sent
+            self._drained.wait_for(lambda: self._file is None or self._error is not None)
+            if self._error is not None:
+                raise DisconnectedError()
+            self._activate()
+            self._pending += data
+            if wait:
+                self._wait_drained()
+
+    def sendfile(self, fd, offset, count):
+        """
+        Sends count bytes of a file from offset without copying them
+        Blocks until all queued data is sent
+        """
+        with self._pacer.lock:
+            self._drained.wait_for(lambda: self._file is None or self._error is not None)
+            if self._error is not None:
+                raise DisconnectedError()
+            if count <= 0:
+                return
+            self._activate()
+            self._file = (fd, offset, count)
+            self._wait_drained()
+
+    def _activate(self):
+        if not self._pending and self._file is None:
+            # Bucket starts empty, no burst after an idle period
+            self._tokens = 0.0
+            self._last = time.monotonic()
+            self._pacer.activate(self)
+
+    def _wait_drained(self):
+        self._drained.wait_for(lambda: (not self._pending and self._file is None) or self._error is not None)
+        if self._error is not None:
+            raise DisconnectedError()
+
+    def pending(self):
+        """ Gets the number of bytes waiting to be sent """
+        return len(self._pending) + (self._file[2] if self._file is not None else 0)
+
+    def _tick(self, now, tick):
+        """
+        Sends the bytes allowed since last tick, called with the pacer lock held
+        Returns True when all pending bytes are sent
+        """
+        self._tokens = min(self._tokens + (now - self._last) * self._rate,
+                           max(self._rate * tick * 2, 1.0))
+        self._last = now
+        count = int(self._tokens)
+        if count > 0:
+            try:
+                if self._pending:
+                    sent = self.con.send(self._pending[:count])
+                    del self._pending[:sent]
+                elif self._file is not None:
+                    fd, offset, remaining = self._file
+                    sent = os.sendfile(self.con.fileno(), fd, offset, min(count, remaining))
+                    if sent == 0:
+                        raise ConnectionResetError("connection closed")
+                    self._file = (fd, offset + sent, remaining - sent) if sent < remaining else None
+                else:
+                    sent = 0
+                self._tokens -= sent
+            except BlockingIOError:
+                pass
+            except OSError as e:
+                self._error = e
+                self._pending.clear()
+                self._file = None
+        if self._pending or self._file is not None:
+            return False
+        self._drained.notify_all()
+        return True
+
+
+class BaudPacer(Thread):
+    """
+    Shared timer sending queued bytes of every paced connection
+    Each tick sends a chunk per connection, so the average rate follows
+    the monotonic clock whatever the sleep accuracy
+    """
+    # Seconds between two sends
+    TICK = 0.1
+
+    _instance = None
+
+    def __init__(self, tick=TICK):
+        Thread.__init__(self, name='pacer', daemon=True)
+        self.tick = tick
+        self.lock = Lock()
+        self._wakeup = Condition(self.lock)
+        # Connections having bytes to send
+        self._active = set()
+
+    @staticmethod
+    def get_instance():
+        """ Gets the process wide pacer """
+        with _instance_lock:
+            if BaudPacer._instance is None:
+                BaudPacer._instance = BaudPacer()
+                BaudPacer._instance.start()
+            return BaudPacer._instance
+
+    def open(self, con, baud_rate):
+        """ Creates a paced connection on a socket """
+        return PacedConnection(self, con, baud_rate)
+
+    def activate(self, connection):
+        """ Schedules a connection having bytes to send, called with the lock held """
+        self._active.add(connection)
+        self._wakeup.notify()
+
+    def close(self, connection):
+        """ Stops pacing a connection, pending bytes are dropped """
+        with self.lock:
+            self._active.discard(connection)
+            connection._pending.clear()
+            connection._file = None
+            connection._drained.notify_all()
+
+    def run(self):
+        next_tick = time.monotonic()
+        while True:
+            with self.lock:
+                self._wakeup.wait_for(lambda: self._active)
+                now = time.monotonic()
+                for connection in list(self._active):
+                    if connection._tick(now, self.tick):
+                        self._active.discard(connection)
+            next_tick = max(next_tick + self.tick, time.monotonic())
+            time.sleep(max(next_tick - time.monotonic(), 0))
+
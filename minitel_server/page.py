@@ -8,22 +8,95 @@ import logging
 import os
 import yaml
 import re
+import sys
+from threading import Lock
 from . import constant
 from minitel_server.terminal import Terminal, FormInput
 from minitel_server.exceptions import UserTerminateSessionError
 from minitel_server.configuration import Configuration
+from minitel_server.page_bundle import PageBundle
 
 logger = logging.getLogger('page')
 
+# Uses the C YAML parser when available
+YAML_LOADER = getattr(yaml, 'CFullLoader', yaml.FullLoader)
+PAGE_EXTENSIONS = ('.vdt', '.vtx')
+
+_pages_lock = Lock()
+
 
 class Page(object):
     """
     Represents a minitel page template
+    Pages returned by get_page are shared by all sessions and can't be modified
     """
+    # Compiled pages by (service, fullname), with the stamp they were compiled for
+    pages = {}
+    # Folder and yaml file of pages by (service, fullname)
+    _locations = {}
 
     @staticmethod
     def get_page(service, name):
-        return Page(service, name)  # Page.pages[name];
+        """
+        Gets a compiled page, the page is compiled again if its folder
+        or its yaml file changed
+        """
+        key = (str(service), name or '')
+        location = Page._locations.get(key)
+        if location is None:
+            folder, page_name = Page.get_page_folder(service, name)
+            location = (folder, os.path.join(folder, page_name + '.yaml'))
+            Page._locations[key] = location
+        bundle = PageBundle.get_instance()
+        if bundle is not None and bundle.get_page(location[0]) is not None:
+            # Bundled pages only change with the bundle
+            stamp = bundle.stamp
+        else:
+            stamp = Page._stamp(*location)
+        entry = Page.pages.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+        logger.debug("Compiling page %s of service %s", name, service)
+        page = Page(service, name)
+        with _pages_lock:
+            Page.pages[key] = (stamp, page)
+        return page
+
+    @staticmethod
+    def get_page_folder(service, name):
+        """ Gets the folder and the name of a page """
+        if name is None:
+            return os.path.join(Configuration.page_folder, str(service)), str(service)
+        tokens = name.split('.')
+        return os.path.join(Configuration.page_folder, str(service), *tokens), tokens[-1]
+
+    @staticmethod
+    def _stamp(*paths):
+        """ Gets the modification times of paths (None if missing) """
+        stamp = []
+        for path in paths:
+            try:
+                stamp.append(os.stat(path).st_mtime_ns)
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    @staticmethod
+    def walk_pages(service):
+        """
+        Gets the names of all pages of a service (None for the root page)
+        A page is a folder holding a file named as the folder (yaml, vdt or vtx)
+        """
+        service_folder = os.path.join(Configuration.page_folder, str(service))
+        for folder, dirs, files in os.walk(service_folder):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('_'))
+            relative = os.path.relpath(folder, service_folder)
+            if relative == '.':
+                yield None
+                continue
+            name = os.path.basename(folder)
+            if any(name + extension in files for extension in ('.yaml', '.vdt', '.vtx')):
+                yield '.'.join(relative.split(os.sep))
 
     def __init__(self, service, name):
         """
@@ -31,43 +104,54 @@ class Page(object):
         """
         self.service = service
         self.forms = None
+        # FormActions of each form
+        self.actions = ()
         self.handler = None
-        if name is None:
-            self.name = str(service)
-            self.fullname = ''
-            self.page_folder = os.path.join(Configuration.page_folder, str(self.service))
+        # Maximum transmission time (seconds) checked by the page analyzer
+        self.latency_budget = None
+        self.fullname = name or ''
+        self.page_folder, self.name = Page.get_page_folder(service, name)
+        logger.debug("Minitel page folder is %s", self.page_folder)
+        bundle = PageBundle.get_instance()
+        bundled = bundle.get_page(self.page_folder) if bundle is not None else None
+        if bundled is not None:
+            data, self.data_file = bundled
         else:
-            tokens = name.split('.')
-            self.fullname = name
-            self.name = tokens[len(tokens) - 1]
-            self.page_folder = os.path.join(Configuration.page_folder, str(self.service))
-            for x in range(len(tokens)):
-                self.page_folder = os.path.join(self.page_folder, tokens[x])
-        logger.debug("Minitel page folder is {}".format(self.page_folder))
-        # Load page configuration from its yaml
+            data, self.data_file = self._load()
+        if data is not None:
+            # get list of forms
+            forms = data.get('forms', None)
+            if forms is not None:
+                self.forms = tuple(forms)
+                self.actions = compile_actions(self.forms, self.service)
+            self.handler = data.get('handler', None)
+            self.latency_budget = data.get('latency_budget', None)
+        self._frozen = True
+
+    def _load(self):
+        """ Gets the yaml configuration and the data file of the page from its folder """
+        data = None
         page_file = os.path.join(self.page_folder, self.name + '.yaml')
         try:
             with open(page_file) as f:
-                data = yaml.load(f, Loader=yaml.FullLoader)
-                if data is None:
-                    return
-                # get list of forms
-                self.forms = data.get('forms', None)
-                self.handler = data.get('handler', None)
+                data = yaml.load(f, Loader=YAML_LOADER)
         except FileNotFoundError:
             pass
+        # Page VTX data file
+        for extension in PAGE_EXTENSIONS:
+            file_path = os.path.join(self.page_folder, self.name + extension)
+            if os.path.exists(file_path):
+                return data, file_path
+        return data, None
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError("Page {} is shared and can't be modified".format(self.fullname))
+        super().__setattr__(name, value)
 
     def get_page_data(self):
         """ Get page VTX data file """
-        file_path = os.path.join(self.page_folder, self.name + '.vdt')
-        if os.path.exists(file_path):
-            return file_path
-
-        file_path = os.path.join(self.page_folder, self.name + '.vtx')
-        if os.path.exists(file_path):
-            return file_path
-
-        return None
+        return self.data_file
 
     def get_handler(self):
         """" Gets custom handler """
@@ -84,10 +168,76 @@ class Page(object):
                 return Configuration.PAGE_LOCATION + '.' + str(self.service) + '.' + self.fullname + '.' + self.name
 
 
+class FormActions(object):
+    """
+    Compiled actions of a form, gets the page to go for a form text
+    Actions are tried in order, a value matches the start of the text
+    ignoring case. Plain values are looked up in a dictionary
+    """
+    __slots__ = ('_literals', '_lengths', '_patterns')
+
+    def __init__(self, actions):
+        # Lowered plain value: (action index, page)
+        self._literals = {}
+        # (action index, compiled value, page)
+        self._patterns = []
+        for index, action in enumerate(actions or ()):
+            if 'value' not in action or 'page' not in action:
+                continue
+            value = str(action['value'])
+            page = str(action['page'])
+            if value.isascii() and re.escape(value) == value:
+                self._literals.setdefault(value.lower(), (index, page))
+            else:
+                self._patterns.append((index, re.compile(value, re.IGNORECASE), page))
+        self._lengths = tuple(sorted({len(value) for value in self._literals}))
+
+    def match(self, text):
+        """
+        Gets the page name of the first action matching text, None if no match
+        """
+        found = None
+        if self._lengths:
+            lowered = text.lower()
+            for length in self._lengths:
+                if length > len(lowered):
+                    break
+                literal = self._literals.get(lowered[:length])
+                if literal is not None and (found is None or literal[0] < found[0]):
+                    found = literal
+        for index, pattern, page in self._patterns:
+            if found is not None and index > found[0]:
+                break
+            if pattern.match(text):
+                return page
+        return found[1] if found is not None else None
+
+    def pages(self):
+        """ Gets all page names reachable from this form """
+        return [page for _index, page in self._literals.values()] + \
+            [page for _index, _pattern, page in self._patterns]
+
+
+def compile_actions(forms, service):
+    """
+    Compiles the actions of the forms of a page
+    """
+    actions = tuple(FormActions(form.get('actions')) for form in forms)
+    for form_actions in actions:
+        for name in form_actions.pages():
+            folder, _name = Page.get_page_folder(service, name)
+            if not os.path.isdir(folder):
+                logger.warning("Action of service %s goes to missing page %s", service, name)
+    return actions
+
+
 class PageContext(object):
     """
     Navigation context
+    Contexts are linked to the previous one (for RETOUR), only the last
+    Configuration.navigation_depth contexts of a session are kept
     """
+    __slots__ = ('previous', 'data', 'custom_data', 'current_page', 'depth')
 
     def __init__(self, current_handler, next_page, custom_data=None):
         """
@@ -98,29 +248,100 @@ class PageContext(object):
         """
         if current_handler is not None:
             self.previous = current_handler.context
-            form_data = {}
-            if current_handler.minitel.forms is not None:
-                for i in range(0, len(current_handler.minitel.forms)):
-                    form_text = current_handler.minitel.forms[i].text
-                    form_data["text_{}".format(i)] = form_text
             self.data = self.previous.data
-            self.data[self.previous.current_page.name] = form_data
-
             self.custom_data = self.previous.custom_data
+            self.depth = self.previous.depth + 1
+            name = self.previous.current_page.name
+            # Form texts of the page left, the dictionary of the page is reused
+            form_data = self.data.get(name)
+            if form_data is None:
+                form_data = self.data[name] = {}
+            else:
+                form_data.clear()
+            if current_handler.minitel.forms is not None:
+                for i, form_input in enumerate(current_handler.minitel.forms):
+                    form_data[_form_key(i)] = form_input.text
+
             if custom_data is not None:
-                self.custom_data[self.previous.current_page.name] = custom_data
+                self.custom_data[name] = custom_data
+            if self.depth > Configuration.navigation_depth:
+                self._trim(Configuration.navigation_depth)
         else:
             self.previous = None
             self.data = {}
             self.custom_data = {}
+            self.depth = 1
 
         self.current_page = next_page
 
+    @staticmethod
+    def from_pages(pages, data, custom_data):
+        """
+        Rebuilds the contexts of a navigation from its pages, oldest first
+        """
+        context = None
+        for page in pages[-Configuration.navigation_depth:]:
+            new_context = PageContext.__new__(PageContext)
+            new_context.previous = context
+            new_context.data = data
+            new_context.custom_data = custom_data
+            new_context.depth = context.depth + 1 if context is not None else 1
+            new_context.current_page = page
+            context = new_context
+        return context
+
+    def get_pages(self):
+        """ Gets the pages of the navigation, oldest first """
+        pages = []
+        context = self
+        while context is not None:
+            pages.append(context.current_page)
+            context = context.previous
+        pages.reverse()
+        return pages
+
+    def _trim(self, max_depth):
+        """ Forgets the contexts older than max_depth """
+        context = self
+        depth = 1
+        while context.previous is not None and depth < max_depth:
+            context = context.previous
+            depth += 1
+        context.previous = None
+        self.depth = depth
+
+    def memory_report(self):
+        """
+        Gets the number of contexts kept and their approximate size in bytes
+        """
+        contexts = 0
+        size = sys.getsizeof(self.data) + sys.getsizeof(self.custom_data)
+        for form_data in self.data.values():
+            size += sys.getsizeof(form_data) + sum(sys.getsizeof(text) for text in form_data.values())
+        context = self
+        while context is not None:
+            contexts += 1
+            size += sys.getsizeof(context)
+            context = context.previous
+        return {'contexts': contexts, 'size': size}
+
+
+# Keys of form texts in PageContext.data
+_FORM_KEYS = tuple("text_{}".format(i) for i in range(16))
+
+
+def _form_key(index):
+    if index < len(_FORM_KEYS):
+        return _FORM_KEYS[index]
+    return "text_{}".format(index)
+
 
 class PageHandler(object):
     """
     Abstract page handler for custom handlers
     """
+    # Handlers using minitel.screen_update() set it, the terminal then follows the screen content
+    SCREEN_MODEL = False
 
     def __init__(self, minitel, context):
         self.minitel = minitel
@@ -146,6 +367,13 @@ class PageHandler(object):
         """
         return None
 
+    def get_next_pages(self):
+        """
+        Gets the names of the pages likely shown after this one
+        They are loaded in background while the user reads this page
+        """
+        return ()
+
 
 class DefaultPageHandler(PageHandler):
     """
@@ -180,29 +408,38 @@ class DefaultPageHandler(PageHandler):
             # Wait for zones
             key = self.minitel.wait_form_inputs()
             logger.debug('Got zone SEP key : {}'.format(key))
-            next_page = None
-            i = 0
-            for value in self.forms:
-                # test if zone match
-                # Check if forms matches regular expression
-                form_text = self.minitel.forms[i].text
-                if 'actions' in value:
-                    for action in value['actions']:
-                        if 'value' in action:
-                            value_pattern = str(action['value'])
-                            if re.match(value_pattern, form_text, re.RegexFlag.IGNORECASE):
-                                # value match. what to do now?
-                                if 'page' in action:
-                                    next_page = Page.get_page(self.context.current_page.service, str(action['page']))
-                                    break
-                i = i + 1
-                if next_page is not None:
-                    new_context = PageContext(self, next_page)
-                    break
+            new_context = self.match_actions()
         else:
             sep, key = self.minitel.wait_input()
-            if sep and key == Terminal.RETOUR:
-                new_context = self.context.previous
-            elif sep and key == Terminal.CONNEXION_FIN:
-                raise UserTerminateSessionError
+            new_context = self.handle_key(sep, key)
         return new_context
+
+    def get_next_pages(self):
+        names = []
+        for form_actions in self.page.actions:
+            names += form_actions.pages()
+        return names
+
+    def match_actions(self):
+        """
+        Gets the context of the first form action matching the inputs
+        """
+        if self.forms is self.page.forms:
+            actions = self.page.actions
+        else:
+            actions = compile_actions(self.forms, self.page.service)
+        for form_input, form_actions in zip(self.minitel.forms, actions):
+            name = form_actions.match(form_input.text)
+            if name is not None:
+                return PageContext(self, Page.get_page(self.context.current_page.service, name))
+        return None
+
+    def handle_key(self, sep, key):
+        """
+        Handles a key pressed on a page without forms
+        """
+        if sep and key == Terminal.RETOUR:
+            return self.context.previous
+        elif sep and key == Terminal.CONNEXION_FIN:
+            raise UserTerminateSessionError
+        return None
@@ -0,0 +1,101 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+
+Page transmission time analyzer
+Reports the size of every page as served and the time needed to fill
+the screen, fails if a page exceeds its latency budget (latency_budget
+in the page yaml or in configuration.yaml, in seconds at baud_rate)
+
+Usage: python -m minitel_server.page_analyzer [--top N] [--baud-rate BPS] [--budget SECONDS] [services]
+"""
+import argparse
+import logging
+import os
+import sys
+from collections import namedtuple
+
+from minitel_server.configuration import Configuration
+from minitel_server.page import Page
+from minitel_server.pacer import bytes_per_second
+from minitel_server.vdt_optimizer import read_optimized
+
+logger = logging.getLogger('PageAnalyzer')
+
+RATES = (1200, 4800, 9600)
+
+PageReport = namedtuple('PageReport', ['service', 'name', 'filename', 'raw_size', 'size', 'budget'])
+
+
+def transmission_time(size, baud_rate):
+    """ Gets the seconds needed to send size bytes """
+    return size / bytes_per_second(baud_rate)
+
+
+def over_budget(report, baud_rate):
+    """ Tells if a page takes longer than its budget """
+    return report.budget is not None and \
+        transmission_time(report.size, baud_rate) > float(report.budget)
+
+
+def analyze_service(service, default_budget=None):
+    """
+    Gets the report of every page of a service
+    """
+    reports = []
+    for name in Page.walk_pages(service):
+        page = Page.get_page(service, name)
+        filename = page.get_page_data()
+        if filename is None:
+            continue
+        budget = page.latency_budget if page.latency_budget is not None else default_budget
+        reports.append(PageReport(service, name or '', filename, os.path.getsize(filename),
+                                  len(read_optimized(filename)), budget))
+    return reports
+
+
+def get_services():
+    """ Gets the numbered folders of the pages folder """
+    return sorted(int(d) for d in next(os.walk(Configuration.page_folder))[1] if d.isdigit())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Reports page transmission times')
+    parser.add_argument('services', nargs='*', type=int, help='Services to analyze (default all)')
+    parser.add_argument('--top', type=int, default=0, help='Only shows the N slowest pages')
+    parser.add_argument('--baud-rate', type=int, help='Speed used for the budget (default baud_rate)')
+    parser.add_argument('--budget', type=float, help='Default budget in seconds (default latency_budget)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    Configuration.load_configuration()
+    baud_rate = args.baud_rate or Configuration.baud_rate
+    default_budget = args.budget if args.budget is not None else Configuration.latency_budget
+
+    reports = []
+    for service in args.services or get_services():
+        reports += analyze_service(service, default_budget)
+    reports.sort(key=lambda r: r.size, reverse=True)
+
+    print("{:<6} {:<28} {:>6} {:>6} ".format('serv.', 'page', 'file', 'sent') +
+          ' '.join("{:>7}".format(rate) for rate in RATES) + "  budget")
+    failures = [report for report in reports if over_budget(report, baud_rate)]
+    for report in reports[:args.top or None]:
+        budget = ''
+        if report.budget is not None:
+            budget = "  {}s{}".format(report.budget, ' EXCEEDED' if report in failures else '')
+        print("{:<6} {:<28} {:>6} {:>6} ".format(report.service, report.name or '(root)',
+                                                  report.raw_size, report.size) +
+              ' '.join("{:>6.1f}s".format(transmission_time(report.size, rate)) for rate in RATES) +
+              budget)
+
+    if failures:
+        print("{} page(s) over budget at {} bps: {}".format(
+            len(failures), baud_rate, ', '.join(r.filename for r in failures)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+
+Packed page bundle
+The page tree is compiled into a single file holding the parsed page
+configurations and the page files already encoded for the wire
+(identical files are stored once). The server maps it in memory and
+no longer reads the pages folder
+
+File layout : MAGIC, index length (4 bytes little endian), JSON index,
+then the contents (Videotex stream followed by wire bytes)
+
+Usage: python -m minitel_server.page_bundle [--output FILE] [services]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from threading import Lock
+
+from minitel_server.configuration import Configuration
+from minitel_server.constant import PROCESS_PARITY
+from minitel_server.content_cache import Content, encode_content
+from minitel_server.screen import screen_after_clear
+
+logger = logging.getLogger('PageBundle')
+
+MAGIC = b'MTBUNDL1'
+_HEADER = struct.Struct('<I')
+# Page files put in the bundle
+BUNDLE_EXTENSIONS = ('.vdt', '.vtx')
+
+_instance_lock = Lock()
+
+
+class PageBundle(object):
+    """
+    Page bundle mapped in memory
+    Pages and files are identified by their path relative to the pages folder
+    """
+    # Seconds between two checks of the bundle file
+    CHECK_INTERVAL = 1.0
+    _instance = None
+    # Monotonic time of the last check and (inode, mtime, size) of the loaded file
+    _checked = None
+    _file_key = None
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = open(filename, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        view = memoryview(self._map)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError("{} is not a page bundle".format(filename))
+        length, = _HEADER.unpack_from(view, len(MAGIC))
+        start = len(MAGIC) + _HEADER.size
+        index = json.loads(bytes(view[start:start + length]).decode('utf-8'))
+        if index['parity'] != PROCESS_PARITY:
+            raise ValueError("{} was built with parity {}".format(filename, index['parity']))
+        # Changes when the bundle is rebuilt, used as page stamp
+        self.stamp = index['built']
+        self._pages = index['pages']
+        self._services = index['services']
+        self._views = [(view[data:data + data_length], view[wire:wire + wire_length])
+                       for data, data_length, wire, wire_length in index['contents']]
+        # Content objects are made on first use (their screen is interpreted)
+        self._contents = [None] * len(self._views)
+        self._wire_offsets = [wire for _data, _data_length, wire, _wire_length in index['contents']]
+        self._files = index['files']
+        # Relative path of absolute paths already seen
+        self._root = os.path.abspath(Configuration.page_folder)
+        self._relative = {}
+
+    @staticmethod
+    def get_instance():
+        """
+        Gets the bundle set by Configuration.page_bundle, None if not set
+        or not built. The bundle is loaded again when its file is rebuilt
+        (sessions drawing from the previous one keep it)
+        """
+        checked = PageBundle._checked
+        if checked is not None and time.monotonic() - checked < PageBundle.CHECK_INTERVAL:
+            return PageBundle._instance
+        with _instance_lock:
+            checked = PageBundle._checked
+            if checked is None or time.monotonic() - checked >= PageBundle.CHECK_INTERVAL:
+                PageBundle._refresh()
+                PageBundle._checked = time.monotonic()
+            return PageBundle._instance
+
+    @staticmethod
+    def _refresh():
+        """ Loads the bundle file if it changed, the loaded one stays if the new one is not valid """
+        filename = Configuration.page_bundle
+        if filename is None:
+            return
+        try:
+            stat = os.stat(filename)
+        except FileNotFoundError:
+            return
+        file_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if file_key == PageBundle._file_key:
+            return
+        PageBundle._file_key = file_key
+        try:
+            PageBundle._instance = PageBundle(filename)
+            logger.info("Serving pages from {}".format(filename))
+        except (OSError, ValueError, KeyError) as e:
+            logger.error("Can't load page bundle {}: {}".format(filename, e))
+
+    def _relative_path(self, path):
+        relative = self._relative.get(path)
+        if relative is None:
+            relative = os.path.relpath(os.path.abspath(path), self._root).replace(os.sep, '/')
+            self._relative[path] = relative
+        return relative
+
+    def get_page(self, folder):
+        """ Gets the (configuration, data file) of a page folder, None if not bundled """
+        entry = self._pages.get(self._relative_path(folder))
+        if entry is None:
+            return None
+        data_file = entry['data_file']
+        if data_file is not None:
+            data_file = os.path.join(Configuration.page_folder, *data_file.split('/'))
+        return entry['config'], data_file
+
+    def get_page_names(self, service):
+        """ Gets the names of the pages of a service (None for the root page), None if not bundled """
+        names = self._services.get(str(service))
+        if names is None:
+            return None
+        return [name or None for name in names]
+
+    def get_content(self, filename):
+        """ Gets the Content of a page file (memory views of the bundle), None if not bundled """
+        index = self._files.get(self._relative_path(filename))
+        if index is None:
+            return None
+        content = self._contents[index]
+        if content is None:
+            data, wire = self._views[index]
+            content = self._contents[index] = Content(None, data, wire, screen_after_clear(data))
+        return content
+
+    def get_wire_offset(self, filename):
+        """ Gets the position of the wire bytes of a page file in the bundle file """
+        return self._wire_offsets[self._files[self._relative_path(filename)]]
+
+    def fileno(self):
+        """ Gets the file descriptor of the bundle """
+        return self._file.fileno()
+
+    def get_file(self):
+        """ Gets the file object of the bundle (for loop.sendfile, its position is not used) """
+        return self._file
+
+
+def build(services, output):
+    """
+    Builds the bundle of services, returns the number of pages, files and stored contents
+    """
+    from minitel_server.page import YAML_LOADER, Page
+    import yaml
+
+    root = Configuration.page_folder
+    pages = {}
+    service_pages = {}
+    files = {}
+    contents = []
+    hashes = {}
+    blob = bytearray()
+    for service in services:
+        names = service_pages[str(service)] = []
+        for name in Page.walk_pages(service):
+            folder, page_name = Page.get_page_folder(service, name)
+            names.append(name or '')
+            config = None
+            yaml_file = os.path.join(folder, page_name + '.yaml')
+            if os.path.exists(yaml_file):
+                with open(yaml_file) as f:
+                    config = yaml.load(f, Loader=YAML_LOADER)
+            data_file = None
+            for extension in BUNDLE_EXTENSIONS:
+                if os.path.exists(os.path.join(folder, page_name + extension)):
+                    data_file = os.path.relpath(os.path.join(folder, page_name + extension), root)
+                    data_file = data_file.replace(os.sep, '/')
+                    break
+            pages[os.path.relpath(folder, root).replace(os.sep, '/')] = {'config': config, 'data_file': data_file}
+        # Every page file of the service, also the ones drawn by handlers
+        for folder, dirs, filenames in os.walk(os.path.join(root, str(service))):
+            dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+            for filename in sorted(filenames):
+                if not filename.endswith(BUNDLE_EXTENSIONS):
+                    continue
+                path = os.path.join(folder, filename)
+                with open(path, 'rb') as f:
+                    raw = f.read()
+                digest = hashlib.sha256(raw).digest()
+                index = hashes.get(digest)
+                if index is None:
+                    data, wire = encode_content(raw)
+                    index = hashes[digest] = len(contents)
+                    contents.append((len(blob), len(data), len(blob) + len(data), len(wire)))
+                    blob += data
+                    blob += wire
+                files[os.path.relpath(path, root).replace(os.sep, '/')] = index
+    # Contents offsets are from the start of the file, the index size depends on them
+    built = time.time()
+    start = 0
+    while True:
+        absolute = [(data + start, data_length, wire + start, wire_length)
+                    for data, data_length, wire, wire_length in contents]
+        index = json.dumps({'built': built, 'parity': PROCESS_PARITY, 'pages': pages,
+                            'services': service_pages, 'files': files, 'contents': absolute}).encode('utf-8')
+        header = len(MAGIC) + _HEADER.size + len(index)
+        if header <= start:
+            break
+        start = header + 64
+    tmp = output + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(_HEADER.pack(len(index)))
+        f.write(index)
+        f.write(b' ' * (start - header))
+        f.write(blob)
+    os.replace(tmp, output)
+    return len(pages), len(files), len(contents)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Builds the page bundle')
+    parser.add_argument('services', nargs='*', type=int, help='Services to bundle (default all)')
+    parser.add_argument('--output', help='Bundle file (default page_bundle of configuration.yaml)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    Configuration.load_configuration()
+    output = args.output or Configuration.page_bundle
+    if output is None:
+        parser.error("No output file, set page_bundle in configuration.yaml or use --output")
+    services = args.services or sorted(int(d) for d in next(os.walk(Configuration.page_folder))[1]
+                                       if d.isdigit())
+    pages, files, contents = build(services, output)
+    print("{}: {} pages, {} files, {} contents, {} bytes".format(output, pages, files, contents,
+                                                                  os.path.getsize(output)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
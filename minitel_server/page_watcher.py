@@ -0,0 +1,186 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+
+Watches the pages folder and reloads changed pages and handler modules
+Uses inotify on Linux, polls file modification times elsewhere
+New navigations get the new version, running handlers keep the old one
+"""
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import time
+from threading import Thread
+
+from minitel_server.configuration import Configuration
+from minitel_server.content_cache import ContentCache
+from minitel_server.handlers import HandlerResolver
+from minitel_server.page import Page, PAGE_EXTENSIONS
+
+logger = logging.getLogger('PageWatcher')
+
+WATCHED_EXTENSIONS = ('.yaml', '.py') + PAGE_EXTENSIONS
+
+# inotify flags (sys/inotify.h)
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct('iIII')
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+class PageWatcher(Thread):
+    """
+    Reloads pages of services when their files change
+    """
+    # Seconds between two scans when inotify is not available
+    POLL_INTERVAL = 2.0
+    # Seconds without new event before reloading (files are often written in several steps)
+    SETTLE_DELAY = 0.3
+
+    def __init__(self, services):
+        Thread.__init__(self, name='page-watcher', daemon=True)
+        self.services = [str(service) for service in services]
+        self._folders = [os.path.join(Configuration.page_folder, service) for service in self.services]
+        self._running = True
+
+    def stop(self):
+        """ Stops watching (within POLL_INTERVAL seconds) """
+        self._running = False
+
+    def run(self):
+        try:
+            fd = self._inotify_init()
+        except OSError as e:
+            logger.info("inotify not available ({}), polling pages every {}s".format(e, self.POLL_INTERVAL))
+            self._poll()
+            return
+        try:
+            self._watch(fd)
+        finally:
+            os.close(fd)
+
+    def _inotify_init(self):
+        libc_name = ctypes.util.find_library('c')
+        if libc_name is None:
+            raise OSError("no C library")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("no inotify_init1")
+        self._libc = libc
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        return fd
+
+    def _add_watches(self, fd, folder, watches):
+        for path, dirs, _files in os.walk(folder):
+            dirs[:] = [d for d in dirs if d != '__pycache__']
+            wd = self._libc.inotify_add_watch(fd, os.fsencode(path), _WATCH_MASK)
+            if wd < 0:
+                logger.warning("Can't watch {}: {}".format(path, os.strerror(ctypes.get_errno())))
+            else:
+                watches[wd] = path
+
+    def _watch(self, fd):
+        watches = {}
+        for folder in self._folders:
+            self._add_watches(fd, folder, watches)
+        logger.info("Watching {} page folder(s) with inotify".format(len(watches)))
+        changed = set()
+        while self._running:
+            timeout = self.SETTLE_DELAY if changed else self.POLL_INTERVAL
+            if not select.select([fd], [], [], timeout)[0]:
+                if changed:
+                    self.reload(changed)
+                    changed = set()
+                continue
+            try:
+                data = os.read(fd, 65536)
+            except BlockingIOError:
+                continue
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                folder = watches.get(wd)
+                if folder is None:
+                    continue
+                path = os.path.join(folder, name)
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and name != '__pycache__':
+                        self._add_watches(fd, path, watches)
+                    changed.add(os.path.join(path, ''))
+                elif name.endswith(WATCHED_EXTENSIONS):
+                    changed.add(path)
+
+    def _scan(self):
+        """ Gets the modification time of all watched files """
+        mtimes = {}
+        for folder in self._folders:
+            for path, dirs, files in os.walk(folder):
+                dirs[:] = [d for d in dirs if d != '__pycache__']
+                mtimes[os.path.join(path, '')] = None
+                for name in files:
+                    if name.endswith(WATCHED_EXTENSIONS):
+                        filename = os.path.join(path, name)
+                        try:
+                            mtimes[filename] = os.stat(filename).st_mtime_ns
+                        except FileNotFoundError:
+                            pass
+        return mtimes
+
+    def _poll(self):
+        mtimes = self._scan()
+        while self._running:
+            time.sleep(self.POLL_INTERVAL)
+            current = self._scan()
+            changed = {path for path in current.keys() | mtimes.keys()
+                       if current.get(path, -1) != mtimes.get(path, -1)}
+            mtimes = current
+            if changed:
+                self.reload(changed)
+
+    def _page_of(self, path):
+        """ Gets the (service, name) of the page owning a path """
+        relative = os.path.relpath(os.path.dirname(path), Configuration.page_folder)
+        tokens = relative.split(os.sep)
+        if tokens[0] not in self.services:
+            return None
+        return tokens[0], '.'.join(tokens[1:]) or None
+
+    def reload(self, paths):
+        """
+        Reloads the pages and the handler modules of changed files
+        """
+        resolver = HandlerResolver.get_instance()
+        pages = set()
+        for path in sorted(paths):
+            page = self._page_of(path)
+            if page is None:
+                continue
+            pages.add(page)
+            if path.endswith('.py'):
+                relative = os.path.relpath(path[:-len('.py')], Configuration.page_folder)
+                resolver.reload(Configuration.PAGE_LOCATION + '.' + '.'.join(relative.split(os.sep)))
+        for service, name in sorted(pages, key=lambda p: (p[0], p[1] or '')):
+            if not os.path.isdir(Page.get_page_folder(service, name)[0]):
+                continue
+            try:
+                page = Page.get_page(service, name)
+                if page.get_page_data() is not None:
+                    ContentCache.get_instance().get(page.get_page_data())
+                logger.info("Page {} of service {} reloaded".format(name or '(root)', service))
+            except Exception:
+                logger.exception("Page {} of service {} can't be reloaded".format(name or '(root)', service))
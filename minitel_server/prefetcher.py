@@ -0,0 +1,128 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+
+Speculative loading of the pages reachable from the page being read
+The next pages are compiled, their handler imported and their file
+encoded in the background, so they are sent at once when chosen
+"""
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from minitel_server.configuration import Configuration
+from minitel_server.content_cache import ContentCache
+from minitel_server.handlers import HandlerResolver
+from minitel_server.page import Page
+from minitel_server.page_bundle import PageBundle
+
+logger = logging.getLogger('Prefetcher')
+
+_instance_lock = Lock()
+
+
+class Prefetcher(object):
+    """
+    Loads the next pages of visited pages in background threads
+    Page files loaded in the content cache by the prefetcher and not visited
+    yet are bounded by max_size bytes, the oldest are dropped from the cache
+    (compiled pages and handler classes stay loaded, they are small)
+    """
+    PREFETCH_THREADS = 2
+    _instance = None
+
+    def __init__(self, max_size, threads=PREFETCH_THREADS):
+        self.max_size = max_size
+        self.size = 0
+        self.visits = 0
+        self.prefetched = 0
+        self.hits = 0
+        self.dropped = 0
+        # (file, size) loaded for prefetched pages not visited yet by (service, name)
+        self._pending = OrderedDict()
+        self._running = set()
+        self._lock = Lock()
+        self._executor = None
+        if max_size > 0:
+            self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='prefetch')
+
+    @staticmethod
+    def get_instance():
+        """ Gets the process wide prefetcher """
+        with _instance_lock:
+            if Prefetcher._instance is None:
+                Prefetcher._instance = Prefetcher(Configuration.prefetch_size)
+            return Prefetcher._instance
+
+    def visit(self, page, handler):
+        """
+        Tells a page is being shown by handler, its next pages are loaded
+        The next pages are asked to the handler in a background thread
+        (they may need to read folders)
+        """
+        if self._executor is None:
+            return
+        key = (str(page.service), page.fullname)
+        with self._lock:
+            self.visits += 1
+            pending = self._pending.pop(key, None)
+            if pending is not None:
+                self.hits += 1
+                self.size -= pending[1]
+        self._executor.submit(self._prefetch, str(page.service), handler)
+
+    def _prefetch(self, service, handler):
+        try:
+            names = handler.get_next_pages()
+        except Exception as e:
+            logger.debug("Can't get the next pages of %s: %r", handler.context.current_page.fullname, e)
+            return
+        for name in names:
+            key = (service, name)
+            with self._lock:
+                if key in self._pending or key in self._running or self.size >= self.max_size:
+                    continue
+                self._running.add(key)
+            self._load(key)
+
+    def _load(self, key):
+        data_file = None
+        size = 0
+        try:
+            page = Page.get_page(*key)
+            HandlerResolver.get_instance().resolve(page)
+            bundle = PageBundle.get_instance()
+            cache = ContentCache.get_instance()
+            if page.get_page_data() is not None and \
+                    (bundle is None or bundle.get_content(page.get_page_data()) is None) and \
+                    not cache.contains(page.get_page_data()):
+                data_file = page.get_page_data()
+                size = len(cache.get(data_file).wire)
+        except Exception as e:
+            logger.debug("Can't prefetch page %s of service %s: %r", key[1], key[0], e)
+            with self._lock:
+                self._running.discard(key)
+            return
+        dropped = []
+        with self._lock:
+            self._running.discard(key)
+            self.prefetched += 1
+            self._pending[key] = (data_file, size)
+            self.size += size
+            while self.size > self.max_size and len(self._pending) > 1:
+                _key, (dropped_file, dropped_size) = self._pending.popitem(last=False)
+                self.size -= dropped_size
+                self.dropped += 1
+                if dropped_file is not None:
+                    dropped.append(dropped_file)
+        for dropped_file in dropped:
+            ContentCache.get_instance().discard(dropped_file)
+
+    def stats(self):
+        """ Gets the prefetch counters """
+        with self._lock:
+            return {'visits': self.visits, 'prefetched': self.prefetched, 'hits': self.hits,
+                    'dropped': self.dropped,
+                    'hit_rate': self.hits / self.prefetched if self.prefetched else 0.0}
@@ -0,0 +1,673 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+
+Server side model of the Minitel screen
+The ScreenState follows the cursor and attributes of the Videotex stream
+sent to the Minitel, the Screen also keeps the content and can render the
+minimal stream bringing a screen to another one
+"""
+import logging
+import re
+from collections import namedtuple
+
+logger = logging.getLogger('Screen')
+
+ROWS = 25  # Row 0 is the status row
+COLUMNS = 40  # Columns are numbered from 1
+
+# Character sizes
+NORMAL = 0x4C
+DOUBLE_HEIGHT = 0x4D
+DOUBLE_WIDTH = 0x4E
+DOUBLE_SIZE = 0x4F
+
+# Character attributes, changed by ESC sequences and reset by US, RS and FF
+# In text mode the background colour is a zone attribute, it is only used
+# from the next delimiter (space or semi-graphic character) of the row
+Attributes = namedtuple('Attributes', ['fg', 'bg', 'size', 'inverse', 'blink', 'underline', 'mask', 'g1'])
+DEFAULT_ATTRIBUTES = Attributes(7, 0, NORMAL, False, False, False, False, False)
+
+# A character on screen, char holds the bytes sending it (G0/G1 byte or G2 sequence)
+Cell = namedtuple('Cell', ['char', 'attributes'])
+BLANK = Cell(b' ', DEFAULT_ATTRIBUTES)
+# Cell of the status row when the stream is interpreted without the previous screen
+UNKNOWN = Cell(None, None)
+
+
+class Covered(namedtuple('Covered', ['y', 'x'])):
+    """ Part of a double sized character drawn at (y, x) """
+    pass
+
+
+US = 0x1F
+ESC = 0x1B
+SS2 = 0x19
+SS2_ALIAS = 0x16  # Used as SS2 by some editors
+REP = 0x12
+SO = 0x0E
+SI = 0x0F
+CURSOR_ON = 0x11
+CURSOR_OFF = 0x14
+BS = 0x08
+HT = 0x09
+LF = 0x0A
+VT = 0x0B
+FF = 0x0C
+CR = 0x0D
+CAN = 0x18
+RS = 0x1E
+
+# ESC attributes modelled by the screen
+_FG = range(0x40, 0x48)
+_BG = range(0x50, 0x58)
+_SIZES = (NORMAL, DOUBLE_HEIGHT, DOUBLE_WIDTH, DOUBLE_SIZE)
+_ATTRIBUTE_FLAGS = {
+    0x48: ('blink', True), 0x49: ('blink', False),
+    0x5A: ('underline', True), 0x59: ('underline', False),
+    0x5D: ('inverse', True), 0x5C: ('inverse', False),
+    0x58: ('mask', True), 0x5F: ('mask', False),
+}
+# Protocol sequences (ESC PROx) with the number of bytes following
+_PROTOCOL_LENGTHS = {0x39: 1, 0x3A: 2, 0x3B: 3}
+# G2 diacritics, followed by a letter
+_DIACRITICS = (0x41, 0x42, 0x43, 0x48, 0x4B)
+# Control codes without effect on the screen
+_IGNORED = (0x00,)
+BELL = 0x07
+
+# Characters drawn without control codes between them
+_PRINTABLE = re.compile(rb'[\x20-\xff]+')
+
+# Parser states
+_TEXT = 0
+_ESC = 1
+_US = 2
+_US_DECIMAL = 3
+_SS2 = 4
+_DIACRITIC = 5
+_REP = 6
+_SKIP = 7
+_CSI = 8
+
+
+class ScreenState(object):
+    """
+    Cursor, attributes and background zone of the Minitel, without the
+    screen content
+    """
+
+    def __init__(self):
+        self.x = 1
+        self.y = 1
+        self.attributes = DEFAULT_ATTRIBUTES
+        # Background colour of the current zone
+        self.zone_bg = 0
+        # None until the cursor visibility is set
+        self.cursor_visible = None
+        # False when the stream used something not modelled
+        self.valid = True
+        # True when the stream used bells or protocol sequences
+        self.side_effects = False
+        self._last = None
+        self._state = _TEXT
+        self._args = bytearray()
+        self._skip = 0
+        self._prefix = SS2
+        self._handlers = (self._text, self._esc, self._us, self._us_decimal, self._ss2,
+                          self._diacritic, self._rep, self._skip_byte, self._csi)
+
+    def follow(self, other):
+        """ Takes the cursor, attributes and background zone of another screen """
+        self.x = other.x
+        self.y = other.y
+        self.attributes = other.attributes
+        self.zone_bg = other.zone_bg
+        if other.cursor_visible is not None:
+            self.cursor_visible = other.cursor_visible
+        self.valid = other.valid
+        self._last = other._last
+
+    def replay(self, cleared):
+        """
+        Applies a stream starting with FF using the screen it gives (see
+        screen_after_clear), instead of interpreting it again
+        Returns False if the stream must be fed (inside a sequence)
+        """
+        if self._state != _TEXT:
+            return False
+        self.follow(cleared)
+        self.side_effects = self.side_effects or cleared.side_effects
+        return True
+
+    def clear(self):
+        """ Clears the screen (FF), the status row is kept """
+        self.x = 1
+        self.y = 1
+        self.attributes = DEFAULT_ATTRIBUTES
+        self.zone_bg = 0
+        self._last = None
+        self.valid = True
+
+    # Stream interpreter
+
+    def feed(self, data):
+        """
+        Applies a Videotex stream (without parity) to the screen
+        Characters ending on the cursor row are applied at once
+        """
+        handlers = self._handlers
+        position = 0
+        end = len(data)
+        while position < end:
+            if self._state == _TEXT and data[position] >= 0x20:
+                run_end = _PRINTABLE.match(data, position).end()
+                if self._put_run(data, position, run_end):
+                    position = run_end
+                    continue
+            handlers[self._state](data[position])
+            position += 1
+
+    def _put_run(self, data, start, end):
+        """
+        Moves the cursor after characters one column wide, row by row
+        Returns False if they must be drawn one by one
+        """
+        attributes = self.attributes
+        if attributes.size in (DOUBLE_WIDTH, DOUBLE_SIZE):
+            return False
+        self._last = bytes(data[end - 1:end])
+        while start < end:
+            row_end = min(end, start + COLUMNS + 1 - self.x)
+            if attributes.g1 or data.find(b' ', start, row_end) >= 0:
+                # Starts a background zone
+                self.zone_bg = attributes.bg
+            self.x += row_end - start
+            if self.x > COLUMNS:
+                self.x = 1
+                if self.y != 0:
+                    # The status row does not wrap to the next one
+                    self.y = self.y + 1 if self.y + 1 < ROWS else 1
+                    self.zone_bg = 0
+            start = row_end
+        return True
+
+    def _invalidate(self, reason, b):
+        if self.valid:
+            logger.debug("Screen model lost on %s 0x%x", reason, b)
+        self.valid = False
+
+    def _text(self, b):
+        if b >= 0x20:
+            self._put(bytes((b,)))
+        elif b == US:
+            self._args.clear()
+            self._state = _US
+        elif b == ESC:
+            self._state = _ESC
+        elif b == SS2 or b == SS2_ALIAS:
+            self._prefix = b
+            self._state = _SS2
+        elif b == REP:
+            self._state = _REP
+        elif b == BS:
+            self._move(-1, 0)
+        elif b == HT:
+            self._move(1, 0)
+        elif b == LF:
+            self._move(0, 1)
+        elif b == VT:
+            self._move(0, -1)
+        elif b == FF:
+            self.clear()
+        elif b == CR:
+            self.x = 1
+        elif b == SO:
+            self.attributes = self.attributes._replace(g1=True)
+        elif b == SI:
+            self.attributes = self.attributes._replace(g1=False)
+        elif b == CURSOR_ON:
+            self.cursor_visible = True
+        elif b == CURSOR_OFF:
+            self.cursor_visible = False
+        elif b == 0x13:
+            # SEP sequence
+            self._skip = 1
+            self._state = _SKIP
+        elif b == CAN:
+            self._clear_eol()
+        elif b == BELL:
+            self.side_effects = True
+        elif b == RS:
+            self.x = 1
+            self.y = 1
+            self.attributes = DEFAULT_ATTRIBUTES
+            self.zone_bg = 0
+        elif b not in _IGNORED:
+            self._invalidate('control', b)
+
+    def _esc(self, b):
+        self._state = _TEXT
+        if b in _FG:
+            self.attributes = self.attributes._replace(fg=b - 0x40)
+        elif b in _BG:
+            self.attributes = self.attributes._replace(bg=b - 0x50)
+        elif b in _SIZES:
+            self.attributes = self.attributes._replace(size=b)
+        elif b in _ATTRIBUTE_FLAGS:
+            name, value = _ATTRIBUTE_FLAGS[b]
+            self.attributes = self.attributes._replace(**{name: value})
+        elif b in _PROTOCOL_LENGTHS:
+            self.side_effects = True
+            self._skip = _PROTOCOL_LENGTHS[b]
+            self._state = _SKIP
+        elif b == 0x5B:
+            self._invalidate('CSI', b)
+            self._state = _CSI
+        else:
+            self._invalidate('ESC', b)
+
+    def _us(self, b):
+        if not self._args and 0x30 <= b <= 0x39:
+            # Decimal form
+            self._args.append(b)
+            self._state = _US_DECIMAL
+            return
+        self._args.append(b)
+        if len(self._args) == 2:
+            self._state = _TEXT
+            self._position(self._args[0] - 0x40, self._args[1] - 0x40)
+
+    def _us_decimal(self, b):
+        # Decimal positioning is not modelled
+        self._state = _TEXT
+        self._invalidate('US', b)
+
+    def _position(self, y, x):
+        if 0 <= y < ROWS and 1 <= x <= COLUMNS:
+            self.y = y
+            self.x = x
+        else:
+            self._invalidate('US', y)
+        self.attributes = DEFAULT_ATTRIBUTES
+        self.zone_bg = 0
+
+    def _ss2(self, b):
+        if b in _DIACRITICS:
+            self._args = bytearray((self._prefix, b))
+            self._state = _DIACRITIC
+        else:
+            self._state = _TEXT
+            self._put(bytes((self._prefix, b)))
+
+    def _diacritic(self, b):
+        self._state = _TEXT
+        self._args.append(b)
+        self._put(bytes(self._args))
+
+    def _rep(self, b):
+        self._state = _TEXT
+        last = self._last
+        if last is None or b <= 0x40:
+            return
+        if len(last) == 1 and self._put_run(last * (b - 0x40), 0, b - 0x40):
+            return
+        for _ in range(b - 0x40):
+            self._put(last)
+
+    def _skip_byte(self, _b):
+        self._skip -= 1
+        if self._skip == 0:
+            self._state = _TEXT
+
+    def _csi(self, b):
+        if 0x40 <= b <= 0x7E:
+            self._state = _TEXT
+
+    def _move(self, dx, dy):
+        x = self.x + dx
+        y = self.y + dy
+        if x < 1:
+            x = COLUMNS
+            y -= 1
+        elif x > COLUMNS:
+            x = 1
+            y += 1
+        if self.y == 0 and dy == 0:
+            # Status row does not wrap
+            x = min(max(x, 1), COLUMNS)
+            y = 0
+        elif y < 1:
+            y = ROWS - 1
+        elif y >= ROWS:
+            y = 1
+        if y != self.y:
+            self.zone_bg = 0
+        self.x = x
+        self.y = y
+
+    def _put(self, char):
+        """ Draws a character at cursor position and moves the cursor """
+        self._last = char
+        attributes = self.attributes
+        if _is_delimiter(char, attributes):
+            self.zone_bg = attributes.bg
+        elif attributes.bg != self.zone_bg:
+            attributes = attributes._replace(bg=self.zone_bg)
+        width = 1
+        if attributes.size in (DOUBLE_WIDTH, DOUBLE_SIZE) and self.x < COLUMNS:
+            width = 2
+        self._draw(char, attributes, width)
+        self._move(width, 0)
+
+    def _draw(self, char, attributes, width):
+        """ Stores a character drawn at cursor position, the content is not kept """
+        pass
+
+    def _clear_eol(self):
+        """ Clears from the cursor until the end of the row (CAN) """
+        pass
+
+    def relative_moves(self, x, y):
+        """
+        Gets the shortest relative moves from the cursor to x, y
+        Returns None if relative moves can't be used (status row)
+        """
+        if (x, y) == (self.x, self.y):
+            return b''
+        if y < 1 or self.y < 1 or not 1 <= x <= COLUMNS:
+            return None
+        dy = y - self.y
+        vertical = bytes((LF if dy > 0 else VT,)) * abs(dy)
+        dx = x - self.x
+        horizontal = bytes((HT if dx > 0 else BS,)) * abs(dx)
+        from_start = bytes((CR,)) + bytes((HT,)) * (x - 1)
+        return vertical + min(horizontal, from_start, key=len)
+
+
+class Screen(ScreenState):
+    """
+    Virtual 40x25 Minitel screen
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.cells = [[BLANK] * (COLUMNS + 1) for _ in range(ROWS)]
+
+    def copy(self):
+        """ Copies the screen content and state """
+        screen = Screen()
+        screen.cells = [list(row) for row in self.cells]
+        screen.x = self.x
+        screen.y = self.y
+        screen.attributes = self.attributes
+        screen.zone_bg = self.zone_bg
+        screen.cursor_visible = self.cursor_visible
+        screen.valid = self.valid
+        screen._last = self._last
+        return screen
+
+    def replay(self, cleared):
+        """
+        Applies a stream starting with FF using the screen it gives (see
+        screen_after_clear), instead of interpreting it again
+        Returns False if the stream must be fed (inside a sequence)
+        """
+        if not super().replay(cleared):
+            return False
+        status = [old if new is UNKNOWN else new for old, new in zip(self.cells[0], cleared.cells[0])]
+        self.cells = [list(row) for row in cleared.cells]
+        self.cells[0] = status
+        return True
+
+    def same_content(self, other):
+        """ Tells if two screens display the same thing """
+        return self.cells == other.cells
+
+    def same_state(self, other):
+        """ Tells if two screens display the same thing with the same cursor """
+        return self.cells == other.cells and \
+            (self.x, self.y, self.attributes, self.cursor_visible) == \
+            (other.x, other.y, other.attributes, other.cursor_visible)
+
+    def clear(self):
+        """ Clears the screen (FF), the status row is kept """
+        super().clear()
+        self.cells[1:] = [[BLANK] * (COLUMNS + 1) for _ in range(1, ROWS)]
+
+    def text(self):
+        """ Gets the G0 characters of the screen, for debugging """
+        lines = []
+        for row in self.cells:
+            line = ''
+            for cell in row[1:]:
+                if isinstance(cell, Covered) or cell.attributes.g1:
+                    line += ' '
+                else:
+                    line += chr(cell.char[-1])
+            lines.append(line.rstrip())
+        return '\n'.join(lines)
+
+    def _put_run(self, data, start, end):
+        # Every cell is drawn
+        return False
+
+    def _draw(self, char, attributes, width):
+        x, y = self.x, self.y
+        self.cells[y][x] = Cell(char, attributes)
+        if width == 2:
+            self.cells[y][x + 1] = Covered(y, x)
+        if attributes.size in (DOUBLE_HEIGHT, DOUBLE_SIZE) and y > 1:
+            self.cells[y - 1][x] = Covered(y, x)
+            if width == 2:
+                self.cells[y - 1][x + 1] = Covered(y, x)
+
+    def _clear_eol(self):
+        row = self.cells[self.y]
+        for x in range(self.x, COLUMNS + 1):
+            row[x] = BLANK
+
+    # Renderer
+
+    def render(self, old):
+        """
+        Gets the stream bringing a Minitel displaying old to this screen
+        The cursor and attributes are restored to this screen state
+        """
+        diff, shadow = self._render_cells(old)
+        if len(diff) > COLUMNS:
+            # Clearing first may be shorter
+            cleared = old.copy()
+            cleared.feed(bytes((FF,)))
+            cleared_diff, cleared_shadow = self._render_cells(cleared)
+            if len(cleared_diff) + 1 < len(diff):
+                diff = bytearray((FF,)) + cleared_diff
+                shadow = cleared_shadow
+        self._restore_state(diff, shadow)
+        return bytes(diff)
+
+    def _owner(self, cell):
+        """ Gets the position of a cell to redraw instead of a covered one """
+        owner = self.cells[cell.y][cell.x]
+        if isinstance(owner, Cell) and owner.attributes.size != NORMAL:
+            return cell.y, cell.x
+        return None
+
+    def _render_cells(self, old):
+        """
+        Gets the stream drawing the changed cells and the screen it gives
+        """
+        changed = [set() for _ in range(ROWS)]
+        for y in range(ROWS):
+            new_row, old_row = self.cells[y], old.cells[y]
+            if new_row == old_row:
+                continue
+            for x in range(1, COLUMNS + 1):
+                if new_row[x] != old_row[x]:
+                    cell = new_row[x]
+                    if isinstance(cell, Covered):
+                        owner = self._owner(cell)
+                        if owner is not None:
+                            changed[owner[0]].add(owner[1])
+                            continue
+                    changed[y].add(x)
+
+        out = bytearray()
+        # Follows the state of the Minitel while drawing
+        shadow = old.copy()
+        for y in range(ROWS):
+            if not changed[y]:
+                continue
+            row = self.cells[y]
+            blank_from = COLUMNS + 1
+            while blank_from > 1 and row[blank_from - 1] == BLANK:
+                blank_from -= 1
+            # Merge close changes, rewriting a few cells is cheaper than moving
+            columns = sorted(changed[y])
+            runs = [[columns[0], columns[0]]]
+            for x in columns[1:]:
+                if x - runs[-1][1] <= 3:
+                    runs[-1][1] = x
+                else:
+                    runs.append([x, x])
+            for start, end in runs:
+                if self._render_run(out, shadow, y, self._zone_start(row, start), end, blank_from):
+                    break
+        return out, shadow
+
+    @staticmethod
+    def _zone_start(row, x):
+        """
+        Gets where to start drawing a cell for its background to be set
+        """
+        cell = row[x]
+        if isinstance(cell, Covered) or cell.attributes.bg == 0 or \
+                _is_delimiter(cell.char, cell.attributes):
+            return x
+        # Redraw from the delimiter starting the zone
+        for start in range(x - 1, 0, -1):
+            cell = row[start]
+            if isinstance(cell, Cell) and _is_delimiter(cell.char, cell.attributes):
+                return start
+        return x
+
+    @staticmethod
+    def _emit(out, shadow, data):
+        out += data
+        shadow.feed(data)
+
+    def _move_to(self, out, shadow, y, x, wanted, zone_bg=None):
+        """
+        Moves the cursor with the cheapest sequence
+        zone_bg is the background zone needed at x, y (None if any)
+        """
+        if (shadow.x, shadow.y) == (x, y) and zone_bg in (None, shadow.zone_bg):
+            return
+        moves = shadow.relative_moves(x, y)
+        if moves is not None and zone_bg is not None:
+            if (shadow.zone_bg if y == shadow.y else 0) != zone_bg:
+                # Only US ends the zone
+                moves = None
+        if moves is not None:
+            # Relative moves keep the attributes that US resets
+            cost = len(moves) + len(_attribute_changes(shadow.attributes, wanted))
+            if cost < 3 + len(_attribute_changes(DEFAULT_ATTRIBUTES, wanted)):
+                self._emit(out, shadow, moves)
+                return
+        self._emit(out, shadow, bytes((US, 0x40 + y, 0x40 + x)))
+
+    def _render_run(self, out, shadow, y, start, end, blank_from):
+        """
+        Draws the cells from start to end of a row
+        Returns True if the end of the row was cleared
+        """
+        row = self.cells[y]
+        x = start
+        while x <= end:
+            cell = row[x]
+            if isinstance(cell, Covered):
+                if self._owner(cell) is not None:
+                    # Drawn by its owner
+                    x += 1
+                    continue
+                cell = BLANK
+            if x >= blank_from:
+                # The end of the row is blank
+                wanted = DEFAULT_ATTRIBUTES._replace(fg=shadow.attributes.fg)
+                self._move_to(out, shadow, y, x, wanted)
+                self._emit(out, shadow, _attribute_changes(shadow.attributes, wanted) + bytes((CAN,)))
+                return True
+            wanted = cell.attributes
+            delimiter = _is_delimiter(cell.char, wanted)
+            self._move_to(out, shadow, y, x, wanted, None if delimiter else wanted.bg)
+            if not delimiter:
+                # Background comes from the zone
+                wanted = wanted._replace(bg=shadow.attributes.bg)
+            data = _attribute_changes(shadow.attributes, wanted) + cell.char
+            x += 1
+            if wanted.size == NORMAL and len(cell.char) == 1:
+                # Repeat identical cells
+                count = 0
+                while x + count <= end and count < 63 and row[x + count] == cell:
+                    count += 1
+                if count > 2:
+                    data += bytes((REP, 0x40 + count))
+                    x += count
+            self._emit(out, shadow, data)
+        return False
+
+    def _restore_state(self, out, shadow):
+        """
+        Brings the cursor, attributes and cursor visibility to this screen ones
+        """
+        self._move_to(out, shadow, self.y, self.x, self.attributes)
+        self._emit(out, shadow, _attribute_changes(shadow.attributes, self.attributes))
+        if self.cursor_visible is not None and self.cursor_visible != shadow.cursor_visible:
+            self._emit(out, shadow, bytes((CURSOR_ON if self.cursor_visible else CURSOR_OFF,)))
+
+
+def _is_delimiter(char, attributes):
+    """ Tells if a character starts a background zone """
+    return attributes.g1 or char == b' '
+
+
+def _attribute_changes(current, wanted):
+    """ Gets the sequences changing attributes """
+    out = bytearray()
+    if current == wanted:
+        return out
+    if current.g1 != wanted.g1:
+        out.append(SO if wanted.g1 else SI)
+    if current.fg != wanted.fg:
+        out += bytes((ESC, 0x40 + wanted.fg))
+    if current.bg != wanted.bg:
+        out += bytes((ESC, 0x50 + wanted.bg))
+    if current.size != wanted.size:
+        out += bytes((ESC, wanted.size))
+    if current.inverse != wanted.inverse:
+        out += bytes((ESC, 0x5D if wanted.inverse else 0x5C))
+    if current.blink != wanted.blink:
+        out += bytes((ESC, 0x48 if wanted.blink else 0x49))
+    if current.underline != wanted.underline:
+        out += bytes((ESC, 0x5A if wanted.underline else 0x59))
+    if current.mask != wanted.mask:
+        out += bytes((ESC, 0x58 if wanted.mask else 0x5F))
+    return out
+
+
+def screen_after_clear(data):
+    """
+    Gets the screen left by a stream starting with FF whatever was shown
+    before, to be applied with Screen.replay. The status row cells not
+    written are UNKNOWN. None if data does not start with FF or ends inside
+    a sequence
+    """
+    if not data or data[0] != FF:
+        return None
+    screen = Screen()
+    screen.cells[0] = [UNKNOWN] * (COLUMNS + 1)
+    screen.feed(data)
+    if screen._state != _TEXT:
+        return None
+    return screen
@@ -0,0 +1,110 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+
+In-memory index of the services (child page folders) of a page
+Used to find a service from the code typed by the user and to list them
+"""
+import difflib
+import logging
+import os
+import time
+from threading import Lock
+
+logger = logging.getLogger('ServiceDirectory')
+
+_directories_lock = Lock()
+
+
+class ServiceDirectory(object):
+    """
+    Index of the sub folders of a page folder (folders starting with _ are hidden)
+    The folder is checked for changes at most every CHECK_INTERVAL seconds
+    """
+    CHECK_INTERVAL = 1.0
+    # Minimum prefix length for a prefix match
+    MIN_PREFIX = 2
+    # Minimum similarity ratio for a fuzzy match
+    FUZZY_CUTOFF = 0.7
+    # Directories by folder
+    _directories = {}
+
+    @staticmethod
+    def get_directory(folder):
+        """ Gets the shared index of a folder """
+        directory = ServiceDirectory._directories.get(folder)
+        if directory is None:
+            with _directories_lock:
+                directory = ServiceDirectory._directories.setdefault(folder, ServiceDirectory(folder))
+        return directory
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._lock = Lock()
+        self._mtime = None
+        self._checked = None
+        self.names = ()
+        self._exact = {}
+        self._prefixes = {}
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < self.CHECK_INTERVAL:
+            return
+        with self._lock:
+            try:
+                mtime = os.stat(self.folder).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime != self._mtime or self._checked is None:
+                self._build(mtime)
+            self._checked = now
+
+    def _build(self, mtime):
+        logger.debug("Indexing services of %s", self.folder)
+        names = []
+        if mtime is not None:
+            names = sorted((entry.name for entry in os.scandir(self.folder)
+                            if entry.is_dir() and not entry.name.startswith('_')), key=str.lower)
+        exact = {}
+        prefixes = {}
+        for name in names:
+            lowered = name.lower()
+            exact.setdefault(lowered, name)
+            for length in range(self.MIN_PREFIX, len(lowered)):
+                prefix = lowered[:length]
+                # None marks an ambiguous prefix
+                prefixes[prefix] = None if prefix in prefixes else name
+        self.names = tuple(names)
+        self._exact = exact
+        self._prefixes = prefixes
+        self._mtime = mtime
+
+    def lookup(self, code):
+        """ Gets the folder name of a service code ignoring case, None if not found """
+        self._refresh()
+        return self._exact.get(code.strip().lower())
+
+    def find(self, code):
+        """
+        Gets the folder name of a service code ignoring case, a unique prefix
+        or the closest name, None if not found
+        """
+        self._refresh()
+        code = code.strip().lower()
+        if not code:
+            return None
+        name = self._exact.get(code)
+        if name is None:
+            name = self._prefixes.get(code)
+        if name is None:
+            matches = difflib.get_close_matches(code, self._exact, n=1, cutoff=self.FUZZY_CUTOFF)
+            if matches:
+                name = self._exact[matches[0]]
+        return name
+
+    def get_names(self):
+        """ Gets the sorted folder names of the services """
+        self._refresh()
+        return self.names
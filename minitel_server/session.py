@@ -5,29 +5,31 @@ Created on 18 Dec 2019
 '''
 
 import logging
-from threading import Thread
 from minitel_server.terminal import Terminal, FormInput
 from minitel_server.exceptions import DisconnectedError,\
     UserTerminateSessionError
 from minitel_server.page import Page, PageContext, DefaultPageHandler
+from minitel_server.handlers import HandlerResolver
+from minitel_server.session_store import SessionStore, restore_forms
+from minitel_server.prefetcher import Prefetcher
+from minitel_server.trace import IOTrace
 
 logger = logging.getLogger('Session')
 
 
-class Session(Thread):
+class Session(object):
     '''
-    A Session of Minitel
+    A Session of Minitel, run() is called by a thread of the acceptor
     '''
 
     def __init__(self, ip, port, conn):
         '''
         Constructor
         '''
-        Thread.__init__(self)
         self.ip = ip 
         self.port = port 
         self.conn = conn
-        self.terminal = Terminal(conn)
+        self.terminal = Terminal(conn, trace=IOTrace.create(ip, port))
         self.context = None
         logger.info("Starting a new Minitel Session " 
                         "for IP {ip} on service {port}".
@@ -40,39 +42,51 @@ class Session(Thread):
             self.terminal.home_cursor()
 
             ''' Loads the root page and create the default context '''
-            page = Page.get_page(self.port, None)
-            self.context = PageContext(None, page)
+            forms = None
+            resumed = SessionStore.get_instance().resume(self.ip, self.port)
+            if resumed is not None:
+                self.context, forms = resumed
+            else:
+                page = Page.get_page(self.port, None)
+                self.context = PageContext(None, page)
             while True:
                 ''' Get custom page handler '''
-                handler_name = self.context.current_page.get_handler()
-                if handler_name is None:
+                class_ = HandlerResolver.get_instance().resolve(self.context.current_page)
+                if class_ is None:
                     logger.debug("Using default handler")
                     handler = DefaultPageHandler(self.terminal, self.context)
                 else:
-                    ''' Import the module handler '''
-                    module_name = self.context.current_page.get_module_name()
-                    module = Session.full_import(module_name)
-                    class_ = getattr(module, handler_name)
                     handler = class_(self.terminal, self.context)
+                self.terminal.use_screen_model(handler.SCREEN_MODEL)
+                Prefetcher.get_instance().visit(self.context.current_page, handler)
                 ''' Call before rendering handler '''
                 handler.before_rendering()
+                if forms is not None:
+                    restore_forms(self.terminal, forms)
+                    forms = None
                 ''' Render page '''
                 handler.render()
+                self.terminal.flush()
                 ''' Get new context from the rendered page '''
                 new_context = handler.after_rendering()
+                self.terminal.flush()
                 if new_context is not None:
                     self.context = new_context
 
         except DisconnectedError:
             logger.info("IP {} disconnected".format(self.ip))
+            SessionStore.get_instance().save(self.ip, self.port, self.context, self.terminal)
         except UserTerminateSessionError:
             logger.info("User {} disconnection request".format(self.ip))
             self.conn.close()
-            
-    @staticmethod
-    def full_import(name):
-        """ Import a module by using the full qualifier """
-        m = __import__(name)
-        for n in name.split(".")[1:]:
-            m = getattr(m, n)
-        return m
+        finally:
+            self.report()
+
+    def report(self):
+        """ Logs the memory used by the navigation history """
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        if self.context is not None:
+            report = self.context.memory_report()
+            logger.debug("IP %s kept %d page context(s), %d bytes", self.ip, report['contexts'], report['size'])
+        logger.debug("Prefetcher %s", Prefetcher.get_instance().stats())
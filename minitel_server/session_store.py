@@ -0,0 +1,154 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+
+Keeps the navigation of dropped sessions so a caller reconnecting
+within Configuration.resume_grace seconds comes back on the same page
+Snapshots are kept in memory, or as JSON files in Configuration.session_folder
+when set (shared by worker processes)
+"""
+import logging
+import json
+import os
+import time
+from collections import OrderedDict, namedtuple
+from threading import Lock
+
+from minitel_server.configuration import Configuration
+from minitel_server.page import Page, PageContext
+
+logger = logging.getLogger('SessionStore')
+
+_instance_lock = Lock()
+
+# pages are the (service, name) of the navigation stack, oldest first
+# forms are the texts of the forms of the current page
+# data and custom_data must be JSON serializable to be kept in session_folder
+SessionSnapshot = namedtuple('SessionSnapshot', ['time', 'pages', 'data', 'custom_data', 'forms'])
+
+
+def take_snapshot(context, terminal):
+    """ Gets the snapshot of a session """
+    pages = [(str(page.service), page.fullname) for page in context.get_pages()]
+    forms = [form_input.text for form_input in terminal.forms]
+    return SessionSnapshot(time.time(), pages, context.data, context.custom_data, forms)
+
+
+def restore_forms(terminal, texts):
+    """ Puts back the texts of the forms of the resumed page """
+    for form_input, text in zip(terminal.forms, texts):
+        if form_input.initial_draw:
+            form_input.text = text
+
+
+class SessionStore(object):
+    """
+    Bounded store of session snapshots, keyed by caller IP and service
+    """
+    # Maximum number of snapshots kept in memory
+    MAX_SESSIONS = 1024
+    _instance = None
+
+    def __init__(self, grace, folder=None, max_sessions=MAX_SESSIONS):
+        self.grace = grace
+        self.folder = folder
+        self.max_sessions = max_sessions
+        self._snapshots = OrderedDict()
+        self._lock = Lock()
+        if folder is not None:
+            os.makedirs(folder, exist_ok=True)
+
+    @staticmethod
+    def get_instance():
+        """ Gets the process wide store """
+        with _instance_lock:
+            if SessionStore._instance is None:
+                SessionStore._instance = SessionStore(Configuration.resume_grace, Configuration.session_folder)
+            return SessionStore._instance
+
+    def _filename(self, ip, port):
+        return os.path.join(self.folder, "{}_{}.session".format(ip.replace(':', '-'), port))
+
+    def save(self, ip, port, context, terminal):
+        """
+        Keeps the navigation of a dropped session
+        """
+        if not self.grace or context is None:
+            return
+        self.expire()
+        snapshot = take_snapshot(context, terminal)
+        if self.folder is not None:
+            filename = self._filename(ip, port)
+            try:
+                with open(filename + '.tmp', 'w') as f:
+                    json.dump(snapshot._asdict(), f)
+                os.replace(filename + '.tmp', filename)
+            except (OSError, TypeError, ValueError) as e:
+                logger.warning("Can't save session of {}: {}".format(ip, e))
+                return
+        else:
+            with self._lock:
+                self._snapshots.pop((ip, port), None)
+                self._snapshots[(ip, port)] = snapshot
+                while len(self._snapshots) > self.max_sessions:
+                    self._snapshots.popitem(last=False)
+        logger.info("Session of {} on page {} kept for {}s".format(ip, snapshot.pages[-1][1] or '(root)',
+                                                                  self.grace))
+
+    def _take(self, ip, port):
+        if self.folder is None:
+            with self._lock:
+                return self._snapshots.pop((ip, port), None)
+        filename = self._filename(ip, port)
+        try:
+            with open(filename) as f:
+                snapshot = SessionSnapshot(**json.load(f))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Can't load session of {}: {}".format(ip, e))
+            snapshot = None
+        try:
+            os.remove(filename)
+        except FileNotFoundError:
+            # Taken by another worker
+            return None
+        return snapshot
+
+    def resume(self, ip, port):
+        """
+        Gets the (PageContext, form texts) of a session dropped less than
+        grace seconds ago, None if there is nothing to resume
+        """
+        if not self.grace:
+            return None
+        snapshot = self._take(ip, port)
+        if snapshot is None or time.time() - snapshot.time > self.grace:
+            return None
+        pages = []
+        for service, name in snapshot.pages:
+            try:
+                pages.append(Page.get_page(service, name or None))
+            except Exception as e:
+                logger.warning("Page {} of session of {} can't be resumed: {}".format(name, ip, e))
+        if not pages:
+            return None
+        logger.info("Resuming session of {} on page {}".format(ip, pages[-1].fullname or '(root)'))
+        return PageContext.from_pages(pages, snapshot.data, snapshot.custom_data), snapshot.forms
+
+    def expire(self):
+        """ Drops the snapshots older than grace seconds """
+        limit = time.time() - self.grace
+        if self.folder is not None:
+            for name in os.listdir(self.folder):
+                filename = os.path.join(self.folder, name)
+                try:
+                    if name.endswith('.session') and os.path.getmtime(filename) < limit:
+                        os.remove(filename)
+                except FileNotFoundError:
+                    pass
+            return
+        with self._lock:
+            for key in [key for key, snapshot in self._snapshots.items() if snapshot.time < limit]:
+                del self._snapshots[key]
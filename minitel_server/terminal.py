@@ -5,11 +5,23 @@ Created on 18 Dec 2019
 """
 
 import logging
+import os
+from collections import deque
+from contextlib import contextmanager
 from select import select
 from socket import socket
 
+from minitel_server.configuration import Configuration
+from minitel_server.content_cache import ContentCache
 from minitel_server.constant import SIMULATE_12000_BPS, PROCESS_PARITY
+from minitel_server.decoder import InputDecoder
+from minitel_server.encoding import PARITY_TABLE, add_even_parity, remove_parity, encode_text, \
+    compress_repeats
 from minitel_server.exceptions import DisconnectedError, MinitelTimeoutError
+from minitel_server.pacer import BaudPacer
+from minitel_server.page_bundle import PageBundle
+from minitel_server.screen import Screen, ScreenState, DEFAULT_ATTRIBUTES
+from minitel_server.trace import INPUT, OUTPUT
 import time
 
 logger = logging.getLogger('Terminal')
@@ -21,6 +33,13 @@ class Terminal(object):
     """
     # Some built-in constants
     CONN_TIMEOUT = 200  # Milliseconds to wait for connection data
+    RECV_SIZE = 4096  # Maximum bytes received at once
+    IMPLICIT_BATCH = True  # Output is kept until an input is awaited or flush() is called
+    FLUSH_THRESHOLD = 1024  # Pending output bytes forcing a flush outside batch()
+    SCREEN_MODEL = False  # Keeps a virtual screen used by screen_update() (see use_screen_model)
+    AUTO_REPEAT = True  # Runs of identical characters are sent with REP
+    CACHE_FILES = True  # Pages are sent from the content cache (optimized, parity added)
+    SENDFILE = hasattr(os, 'sendfile')  # Bundled pages are sent by the kernel from the bundle file
 
     # Colour constants
     BLACK = 0
@@ -88,26 +107,93 @@ class Terminal(object):
     PRO2 = 0x3A  # PRO 2 protocol (2 bytes following)
     PRO3 = 0x3B  # PRO 3 protocol (3 bytes following)
 
-    def __init__(self, con):
+    def __init__(self, con, baud_rate=None, trace=None):
         """
         Terminal constructor con is the TCP socket
+        baud_rate is the simulated speed (default from configuration)
+        trace is the optional IOTrace recording every exchanged byte
         """
         self.con = con
+        self._trace = trace
         self.forms = []
         self.current_form = 0
         self._first_read = True
+        # Output buffer reused by every write
+        self._buffer = bytearray()
+        # Encoded bytes waiting to be sent
+        self._output = bytearray()
+        self._batch_depth = 0
+        # Cursor, attributes and zone following everything written, used to
+        # skip sequences not changing them. Unknown until the screen is cleared
+        self.state = ScreenState()
+        self.state.valid = False
+        # Virtual screen used by screen_update(), unknown until cleared
+        self.screen = None
+        if self.SCREEN_MODEL:
+            self.screen = Screen()
+            self.screen.valid = False
+        # Bytes not sent because they did not change the terminal state
+        self.saved_bytes = 0
+        # Screen before the current screen_update() and bytes written since
+        self._update_base = None
+        self._update_raw = bytearray()
+        # Received bytes, parity removed
+        self._input = bytearray()
+        # Decoded inputs not yet consumed
+        self._decoder = InputDecoder()
+        self._events = deque()
+        self.baud_rate = baud_rate or Configuration.baud_rate
+        self._paced = None
+        if SIMULATE_12000_BPS and con is not None:
+            self._paced = BaudPacer.get_instance().open(con, self.baud_rate)
+
+    def use_screen_model(self, enabled):
+        """
+        Starts or stops following the screen content (used by screen_update()),
+        each written byte is drawn on the virtual screen
+        A started model is valid once the screen is cleared
+        """
+        if enabled and self.screen is None:
+            self.screen = Screen()
+            self.screen.valid = False
+        elif not enabled and self.screen is not None and self._update_base is None:
+            self.screen = None
+
+    def set_baud_rate(self, baud_rate):
+        """
+        Changes the simulated speed (75, 1200, 4800 or 9600 bps)
+        """
+        if self._paced is not None:
+            self._paced.baud_rate = baud_rate
+        self.baud_rate = baud_rate
+
+    def close(self):
+        """
+        Closes the connection
+        """
+        self._report()
+        if self._paced is not None:
+            BaudPacer.get_instance().close(self._paced)
+            self._paced = None
+        if self._trace is not None:
+            self._trace.close()
+        self.con.close()
+
+    def _report(self):
+        """
+        Logs the output statistics of the session
+        """
+        if self.saved_bytes:
+            logger.info("%d bytes saved by terminal state tracking", self.saved_bytes)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Content cache %s", ContentCache.get_instance().stats())
 
     @staticmethod
     def add_even_parity(data):
         """
         Add even parity to bytes
         """
-        ret = bytearray()
-        for b in data:
-            if bin(b).count('1') % 2:
-                b |= 0x80
-            ret.append(b)
-        return ret
+        return add_even_parity(data)
 
     @staticmethod
     def remove_parity(data):
@@ -116,71 +202,226 @@ class Terminal(object):
         """
         if not data:
             return data
-        ret = []
-        for c in data:
-            c &= 0x7f
-            ret.append(c)
-        return ret
+        return remove_parity(data)
 
-    def write(self, *data):
+    def encode(self, *data):
         """
-        Write to the socket
+        Encodes data to be sent to the Minitel (with parity if enabled)
         """
-        bytes_data = bytearray()
+        buffer = self._buffer
         for d in data:
-            if isinstance(d, str):
-                bytes_data += bytearray(d, 'utf-8')
-            elif isinstance(d, int):
-                bytes_data += bytearray(d.to_bytes(1, 'big'))
+            if isinstance(d, int):
+                buffer.append(d)
+            elif isinstance(d, str):
+                buffer += d.encode('utf-8')
             else:
-                bytes_data += bytearray(d)
-        logger.debug("Writing {} to Minitel".format(bytes_data))
+                buffer.extend(d)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Writing %s to Minitel", bytes(buffer))
+        self.state.feed(buffer)
+        if self.screen is not None:
+            self.screen.feed(buffer)
+        if self.AUTO_REPEAT:
+            bytes_data = self._parity(compress_repeats(buffer))
+        else:
+            bytes_data = self._parity(buffer)
+        buffer.clear()
+        return bytes_data
+
+    @staticmethod
+    def _parity(data):
+        """
+        Adds parity to raw bytes if enabled
+        """
+        if PROCESS_PARITY:
+            return data.translate(PARITY_TABLE)
+        return bytes(data)
+
+    def write(self, *data):
+        """
+        Write to the socket
+        Data is kept in the output buffer when batching
+        """
+        self._queue(self.encode(*data))
+
+    def _queue(self, bytes_data):
+        """
+        Adds encoded bytes to the output
+        """
+        if self._update_base is not None:
+            # Sent as a difference when the update ends
+            self._update_raw += bytes_data
+            return
+        self._output += bytes_data
+        if self._batch_depth == 0 and \
+                (not self.IMPLICIT_BATCH or len(self._output) >= self.FLUSH_THRESHOLD):
+            self.flush()
+
+    def flush(self):
+        """
+        Sends all the pending output in a single call
+        """
+        self._commit_update()
+        if self._output:
+            bytes_data = bytes(self._output)
+            self._output.clear()
+            self._send(bytes_data)
+
+    @contextmanager
+    def screen_update(self):
+        """
+        Draws the with block on the virtual screen only
+        The real screen is then updated with the shortest stream, either
+        the difference between both screens or the written bytes
+        """
+        if self.screen is None or self._update_base is not None or not self.screen.valid:
+            # Nested, disabled or screen content unknown: writes go through
+            yield self
+            return
+        self._update_base = self.screen.copy()
+        try:
+            yield self
+        finally:
+            self._commit_update()
+            self._update_base = None
+            if self._batch_depth == 0 and not self.IMPLICIT_BATCH:
+                self.flush()
+
+    def _commit_update(self):
+        """
+        Moves what was drawn in the current screen_update to the output
+        """
+        base = self._update_base
+        if base is None:
+            return
+        raw = self._update_raw
+        if self.screen.valid:
+            diff = self.screen.render(base)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Screen update of %d bytes instead of %d", len(diff), len(raw))
+            if len(diff) < len(raw):
+                # Replays the difference, some attribute changes can't be rendered
+                check = base.copy()
+                check.feed(diff)
+                if check.same_state(self.screen):
+                    raw = self._parity(diff)
+                    # The Minitel ends in the state left by the difference
+                    self.state.follow(check)
+        self._output += raw
+        self._update_raw = bytearray()
+        self._update_base = self.screen.copy()
+
+    @contextmanager
+    def batch(self):
+        """
+        Gathers all writes done in the with block and sends them at once
+        """
+        self._batch_depth += 1
         try:
-            if PROCESS_PARITY:
-                bytes_data = self.add_even_parity(bytes_data)
-            if SIMULATE_12000_BPS:
-                for b in bytes_data:
-                    self.con.send(b.to_bytes(1, 'big'))
-                    time.sleep(0.0083)
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.flush()
+
+    def _send(self, bytes_data):
+        """
+        Sends already encoded bytes to the socket
+        """
+        if self._trace is not None:
+            self._trace.record(OUTPUT, bytes_data)
+        try:
+            if self._paced is not None:
+                self._paced.send(bytes_data)
             else:
                 self.con.sendall(bytes_data)
         except ConnectionAbortedError:
             raise DisconnectedError()
 
+    def _queue_file(self, bundle, offset, wire):
+        """
+        Sends the wire bytes of a bundled page file, found at offset in the
+        bundle file, without copying them
+        """
+        if self.con is None:
+            self._queue(wire)
+            return
+        self.flush()
+        if self._paced is not None:
+            self._paced.sendfile(bundle.fileno(), offset, len(wire))
+        else:
+            self._sendfile(bundle.fileno(), offset, len(wire))
+
+    def _sendfile(self, fd, offset, count):
+        """
+        Sends count bytes of a file from offset without copying them
+        """
+        try:
+            while count > 0:
+                try:
+                    sent = os.sendfile(self.con.fileno(), fd, offset, count)
+                except BlockingIOError:
+                    select([], [self.con], [])
+                    continue
+                if sent == 0:
+                    raise DisconnectedError()
+                offset += sent
+                count -= sent
+        except ConnectionError:
+            raise DisconnectedError()
+
     def read(self, timeout=None):
         """
-        Reads a single byte from socket
+        Reads a single byte from the receive buffer
+        The buffer is filled from the socket if empty
+        """
+        if not self._input:
+            self._fill(timeout)
+        data = self._input[0]
+        del self._input[0]
+        return data
+
+    def _fill(self, timeout=None):
         """
+        Waits for data and receives everything available in one call
+        """
+        self.flush()
         ready_to_read, _ready_to_write, _in_error = \
             select(
                 [self.con],
                 [],
                 [],
                 timeout)
-        data = None
-        if len(ready_to_read) != 0:
-            try:
-                if PROCESS_PARITY:
-                    data = self.remove_parity(self.con.recv(1))
-                else:
-                    data = self.con.recv(1)
-                if not data:
-                    raise DisconnectedError
-                logger.debug("Read 0x{0:x} from Minitel".format(data[0]))
-            except ConnectionResetError:
-                raise DisconnectedError
-            return data[0]
-        raise MinitelTimeoutError()
+        if len(ready_to_read) == 0:
+            raise MinitelTimeoutError()
+        try:
+            data = self.con.recv(self.RECV_SIZE)
+        except ConnectionResetError:
+            raise DisconnectedError
+        if not data:
+            raise DisconnectedError
+        self._received(data)
+
+    def _received(self, data):
+        """
+        Adds received bytes to the receive buffer
+        """
+        if self._trace is not None:
+            self._trace.record(INPUT, data)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Read %s from Minitel", bytes(data))
+        if PROCESS_PARITY:
+            data = self.remove_parity(data)
+        self._input += data
 
     def read_n(self, expected=1, timeout=None):
         """
         Reads a given amount of data
         """
-        data = []
-        while len(data) < expected:
-            d = self.read(timeout)
-            data += [d]
-            logger.debug("Read {0:x} from Minitel".format(d))
+        while len(self._input) < expected:
+            self._fill(timeout)
+        data = list(self._input[:expected])
+        del self._input[:expected]
         return data
 
     def read_all(self, timeout=0):
@@ -190,12 +431,33 @@ class Terminal(object):
         """
         try:
             while True:
-                d = self.read(timeout)
-                logger.debug("Garbage data 0x{0:x}".format(d))
+                if not self._input:
+                    self._fill(timeout)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Garbage data %s", bytes(self._input))
+                self._input.clear()
+                self._events.clear()
+                self._decoder.reset()
                 timeout = 0.2
         except MinitelTimeoutError:
             pass
 
+    def _drop_sequence(self):
+        """
+        Drops the input until the Minitel stops sending, after an
+        unsupported sequence. Inputs decoded before it are kept
+        """
+        try:
+            while True:
+                if not self._input:
+                    self._fill(0.2)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Garbage data %s", bytes(self._input))
+                self._input.clear()
+        except MinitelTimeoutError:
+            pass
+        self._decoder.reset()
+
     def wait_connection(self):
         """
         Waits for connection garbage CHARACTERS
@@ -203,7 +465,8 @@ class Terminal(object):
         logger.debug("Waiting for connection data...")
         try:
             while True:
-                self.read(self.CONN_TIMEOUT / 1000)
+                self._fill(self.CONN_TIMEOUT / 1000)
+                self._input.clear()
         except MinitelTimeoutError:
             pass
 
@@ -232,63 +495,54 @@ class Terminal(object):
         """
         Moves cursor to absolute location
         """
-        logger.debug("Move cursor to {}/{}".format(x, y))
+        logger.debug("Move cursor to %d/%d", x, y)
         data = [self.CURSOR_MOVE, 0x40, 0x40]
         data[1] |= y
         data[2] |= x
+        if self._tracking() and self.state.attributes == DEFAULT_ATTRIBUTES and self.state.zone_bg == 0:
+            # Attributes and background zone reset by US are already the default ones
+            moves = self._relative_moves(x, y)
+            if moves is not None and len(moves) < len(data):
+                self.saved_bytes += len(data) - len(moves)
+                if moves:
+                    self.write(moves)
+                return
         self.write(data)
 
+    def _relative_moves(self, x, y):
+        """
+        Gets the shortest relative moves from the cursor to x, y
+        Returns None if relative moves can't be used
+        """
+        if (x, y) == (1, 1) and (self.state.x, self.state.y) != (1, 1):
+            return bytes((self.CURSOR_HOME,))
+        return self.state.relative_moves(x, y)
+
+    def _tracking(self):
+        """
+        Tells if the terminal state is known
+        """
+        return self.state.valid
+
+    def _attribute(self, code, name, value):
+        """
+        Sends an attribute unless already set
+        """
+        if self._tracking() and getattr(self.state.attributes, name) == value:
+            self.saved_bytes += 2
+            return
+        self.write(self.ATTRIBUTE, code)
+
     def print_text(self, text):
         """
         Print a text to the Minitel and replace accents
         """
-        text = text.replace('à', '\x19\x41a')
-        text = text.replace('â', '\x19\x43a')
-        text = text.replace('ä', '\x19\x48a')
-        text = text.replace('è', '\x19\x41e')
-        text = text.replace('é', '\x19\x42e')
-        text = text.replace('ê', '\x19\x43e')
-        text = text.replace('ë', '\x19\x48e')
-        text = text.replace('î', '\x19\x43i')
-        text = text.replace('ï', '\x19\x48i')
-        text = text.replace('ô', '\x19\x43o')
-        text = text.replace('ö', '\x19\x48o')
-        text = text.replace('ù', '\x19\x43u')
-        text = text.replace('û', '\x19\x43u')
-        text = text.replace('ü', '\x19\x48u')
-        text = text.replace('ç', '\x19\x4Bc')
-        text = text.replace('°', '\x19\x30')
-        text = text.replace('£', '\x19\x23')
-        text = text.replace('Œ', '\x19\x6A').replace('œ', '\x19\x7A')
-        text = text.replace('ß', '\x19\x7B')
-
-        # Caractères spéciaux
-        text = text.replace('¼', '\x19\x3C')
-        text = text.replace('½', '\x19\x3D')
-        text = text.replace('¾', '\x19\x3E')
-        text = text.replace('←', '\x19\x2C')
-        text = text.replace('↑', '\x19\x2D')
-        text = text.replace('→', '\x19\x2E')
-        text = text.replace('↓', '\x19\x2F')
-        text = text.replace('̶', '\x60')
-        text = text.replace('|', '\x7C')
-        text = text.replace('«', '"')
-        text = text.replace('»', '"')
-        text = text.replace('’', '')
-
-        # Caractères accentués inexistants sur Minitel
-        text = text.replace('À', 'A').replace('Â', 'A').replace('Ä', 'A')
-        text = text.replace('È', 'E').replace('É', 'E')
-        text = text.replace('Ê', 'E').replace('Ë', 'E')
-        text = text.replace('Ï', 'I').replace('Î', 'I')
-        text = text.replace('Ô', 'O').replace('Ö', 'O')
-        text = text.replace('Ù', 'U').replace('Û', 'U').replace('Ü', 'U')
-        text = text.replace('Ç', 'C')
-        self.write(text)
+        self.write(encode_text(text))
 
     def wait_input(self, timeout=None):
         """
         Waits for user input
+        Returns (True, key) for a function key or (False, character)
         """
         # Remove all previously received characters
         # Real Minitel send some protocol data by it's truncated
@@ -302,144 +556,40 @@ class Terminal(object):
                 pass
             self._first_read = False
 
-        while True:
-            data = self.read(timeout)
-            if data == self.SEP:
-                sep_key = self.read()
-                logger.debug("Got SEP key : 0x{0:x}".format(sep_key))
-                if sep_key < 0x41 or sep_key > 0x49:
-                    logger.debug("SEP is an acknowledge")
-                    continue
-                return True, sep_key - 0x40
-            elif data == self.ACK_PROTO:
-                proto = self.read()
-                logger.debug("Got protocol acknowledge 0x{0:x}".format(proto))
-                if proto == self.PRO1:
-                    data = self.read_n(1)
-                elif proto == self.PRO2:
-                    data = self.read_n(2)
-                elif proto == self.PRO3:
-                    data = self.read_n(3)
-                else:
-                    logger.warning("unsupported protocol ack.")
-                    self.read_all()
-            elif (data >= 0x20) and (data <= 0x7f):
-                return False, data
-            elif data == Terminal.ACCENT:
-                ''' Accent '''
-                acc_code = self.read()
-                if acc_code == 0x23:
-                    return False, '£'
-                elif acc_code == 0x27:
-                    return False, '§'
-                elif acc_code == 0x2C:
-                    return False, '←'
-                elif acc_code == 0x2D:
-                    return False, '↑'
-                elif acc_code == 0x2E:
-                    return False, '→'
-                elif acc_code == 0x2F:
-                    return False, '↓'
-                elif acc_code == 0x30:
-                    return False, '°'
-                elif acc_code == 0x31:
-                    return False, '±'
-                elif acc_code == 0x3C:
-                    return False, '¼'
-                elif acc_code == 0x3D:
-                    return False, '½'
-                elif acc_code == 0x3E:
-                    return False, '¾'
-                elif acc_code == 0x41:
-                    acc_char = self.read(timeout)
-                    if acc_char == 'a':
-                        return False, 'à'
-                    elif acc_char == 'e':
-                        return False, 'è'
-                    elif acc_char == 'i':
-                        return False, 'ì'
-                    elif acc_char == 'o':
-                        return False, 'ò'
-                    elif acc_char == 'u':
-                        return False, 'ù'
-                    else:
-                        return False, acc_char
-                elif acc_code == 0x42:
-                    acc_char = self.read(timeout)
-                    if acc_char == 'a':
-                        return False, 'á'
-                    elif acc_char == 'e':
-                        return False, 'é'
-                    elif acc_char == 'i':
-                        return False, 'í'
-                    elif acc_char == 'o':
-                        return False, 'ó'
-                    elif acc_char == 'u':
-                        return False, 'ú'
-                    else:
-                        return False, acc_char
-                elif acc_code == 0x43:
-                    acc_char = self.read(timeout)
-                    if acc_char == 'a':
-                        return False, 'â'
-                    elif acc_char == 'e':
-                        return False, 'ê'
-                    elif acc_char == 'i':
-                        return False, 'î'
-                    elif acc_char == 'o':
-                        return False, 'ô'
-                    elif acc_char == 'u':
-                        return False, 'û'
-                    else:
-                        return False, acc_char
-                elif acc_code == 0x48:
-                    acc_char = self.read(timeout)
-                    if acc_char == 'a':
-                        return False, 'ä'
-                    elif acc_char == 'e':
-                        return False, 'ë'
-                    elif acc_char == 'i':
-                        return False, 'ï'
-                    elif acc_char == 'o':
-                        return False, 'ö'
-                    elif acc_char == 'u':
-                        return False, 'ü'
-                    else:
-                        return False, acc_char
-                elif acc_code == 0x6A:
-                    return False, 'Œ'
-                elif acc_code == 0x7A:
-                    return False, 'œ'
-                elif acc_code == 0x7B:
-                    return False, 'ß'
-            else:
-                logger.error("Got out of range character :0x{0:x}".format(data))
+        while not self._events:
+            if not self._input:
+                self._fill(timeout)
+            self._events.extend(self._decoder.feed(self._input))
+            self._input.clear()
+            if self._decoder.discarding:
+                self._drop_sequence()
+        return self._events.popleft()
 
     def text_colour(self, colour):
         """
         Set the text colour
         """
-        logger.debug("Setting char colour to {}".format(colour))
-        self.write(self.ATTRIBUTE, ((colour & 0xF) | self.CHAR_COLOR))
+        logger.debug("Setting char colour to %d", colour)
+        self._attribute((colour & 0xF) | self.CHAR_COLOR, 'fg', colour & 0xF)
 
     def background_colour(self, colour):
         """
         Set the text background colour
         """
-        logger.debug("Setting background colour to {}".format(colour))
-        self.write(self.ATTRIBUTE, ((colour & 0xF) | self.BACK_COLOR))
+        logger.debug("Setting background colour to %d", colour)
+        self._attribute((colour & 0xF) | self.BACK_COLOR, 'bg', colour & 0xF)
 
     def reverse_video(self):
         """
         Sets the video in reverse mode
         """
-        self.write(self.ATTRIBUTE, self.REVERSE_VIDEO)
+        self._attribute(self.REVERSE_VIDEO, 'inverse', True)
 
     def normal_video(self):
         """
         Sets the video in normal mode
         """
-        self.write(self.ATTRIBUTE, self.NORMAL_VIDEO)
+        self._attribute(self.NORMAL_VIDEO, 'inverse', False)
 
     def transparent_video(self):
         """
@@ -452,42 +602,42 @@ class Terminal(object):
         Sets if the cursor is blinking
         """
         if blink is True:
-            self.write(self.ATTRIBUTE, self.CURSOR_BLINK)
+            self._attribute(self.CURSOR_BLINK, 'blink', True)
         else:
-            self.write(self.ATTRIBUTE, self.CURSOR_FIXED)
+            self._attribute(self.CURSOR_FIXED, 'blink', False)
 
     def normal_size(self):
         """
         Sets the text in normal size
         """
-        self.write(self.ATTRIBUTE, self.NORMAL_SIZE)
+        self._attribute(self.NORMAL_SIZE, 'size', self.NORMAL_SIZE)
 
     def double_height_size(self):
         """
         Sets the text in double height size
         """
-        self.write(self.ATTRIBUTE, self.DOUBLE_HEIGHT)
+        self._attribute(self.DOUBLE_HEIGHT, 'size', self.DOUBLE_HEIGHT)
 
     def double_width_size(self):
         """
         Sets the text in double width size
         """
-        self.write(self.ATTRIBUTE, self.DOUBLE_WIDTH)
+        self._attribute(self.DOUBLE_WIDTH, 'size', self.DOUBLE_WIDTH)
 
     def double_size(self):
         """
         Sets the text in double size
         """
-        self.write(self.ATTRIBUTE, self.DOUBLE_SIZE)
+        self._attribute(self.DOUBLE_SIZE, 'size', self.DOUBLE_SIZE)
 
     def underline(self, on=True):
         """
         Sets underline on/off
         """
         if on is True:
-            self.write(self.ATTRIBUTE, self.START_UNDERLINE)
+            self._attribute(self.START_UNDERLINE, 'underline', True)
         else:
-            self.write(self.ATTRIBUTE, self.END_UNDERLINE)
+            self._attribute(self.END_UNDERLINE, 'underline', False)
 
     def bell(self):
         """
@@ -529,28 +679,53 @@ class Terminal(object):
         """
         Switch to semi-graphics mode
         """
-        self.write(self.SEMIGRAPHICS_MODE)
+        self._control(self.SEMIGRAPHICS_MODE, self._tracking() and self.state.attributes.g1)
 
     def text_mode(self):
         """
         Switch to text mode
         """
-        self.write(self.TEXT_MODE)
+        self._control(self.TEXT_MODE, self._tracking() and not self.state.attributes.g1)
 
     def visible_cursor(self, visible=True):
         """
         Sets if the cursor will be visible or invisible
         """
+        set_ = self._tracking() and self.state.cursor_visible is visible
         if visible is True:
-            self.write(self.CURSOR_VISIBLE)
+            self._control(self.CURSOR_VISIBLE, set_)
+        else:
+            self._control(self.CURSOR_INVISIBLE, set_)
+
+    def _control(self, code, already_set):
+        """
+        Sends a control code unless its state is already set
+        """
+        if already_set:
+            self.saved_bytes += 1
         else:
-            self.write(self.CURSOR_INVISIBLE)
+            self.write(code)
 
     def draw_file(self, filename):
         """
         Send a raw file to Minitel (VTX. VTD files)
         """
-        logger.debug("Rendering file {}".format(filename))
+        logger.debug("Rendering file %s", filename)
+        if self.CACHE_FILES:
+            bundle = PageBundle.get_instance()
+            content = bundle.get_content(filename) if bundle is not None else None
+            bundled = content is not None
+            if not bundled:
+                content = ContentCache.get_instance().get(filename)
+            if content.screen is None or not self.state.replay(content.screen):
+                self.state.feed(content.data)
+            if self.screen is not None and (content.screen is None or not self.screen.replay(content.screen)):
+                self.screen.feed(content.data)
+            if bundled and self.SENDFILE and self._trace is None and self._update_base is None:
+                self._queue_file(bundle, bundle.get_wire_offset(filename), content.wire)
+                return
+            self._queue(content.wire)
+            return
         with open(filename, 'rb') as f:
             self.write(f.read())
 
@@ -582,11 +757,11 @@ class Terminal(object):
                     self.current_form += 1
                     if self.current_form >= len(self.forms):
                         self.current_form = 0
-                    logger.debug("Moving to next form input : {}".format(self.current_form))
+                    logger.debug("Moving to next form input : %d", self.current_form)
                 else:
                     return key
         else:
-            logger.debug("Using form[{}] only".format(force_form))
+            logger.debug("Using form[%d] only", force_form)
             self.forms[force_form].prepare(self)
             key = self.forms[self.current_form].grab_focus(self, timeout, move_cursor)
             return key
@@ -595,12 +770,9 @@ class Terminal(object):
         """
         Print character c count times
         """
-        self.write(c)
-        if count > 2:
-            self.write(self.CHAR_REPEAT, (0x40 | count - 1))
-        else:
-            for _i in range(1, count):
-                self.write(c)
+        if isinstance(c, int):
+            c = bytes((c,))
+        self.write(c * count)
 
     def show_message(self, text, duration=2, x=1, y=0, reverse=False):
         """
@@ -612,6 +784,7 @@ class Terminal(object):
         if reverse:
             self.reverse_video()
         self.print_text(text)
+        self.flush()
         time.sleep(duration)
         self.move_cursor(x, y)
         if reverse:
@@ -666,42 +839,58 @@ class FormInput(object):
         Manage this input
         """
         if move_cursor:
-            if self._length > 0:
-                # Move to end of text
-                offset = len(self.text)
-                if offset >= self._length:
-                    offset = self._length - 1
-                    if offset < 1:
-                        offset = 1
-                terminal.move_cursor(self._locx + offset, self._locy)
-                terminal.text_colour(self._colour)
-                terminal.visible_cursor(True)
-            else:
-                terminal.visible_cursor(False)
+            self.focus(terminal)
         while True:
             sep, key = terminal.wait_input(timeout)
-            if sep is True:
-                # Minitel key
-                if key == Terminal.CORRECTION:
-                    if len(self.text) < 1:
-                        terminal.bell()
-                    else:
-                        # Don't move back if we are at the end of the field
-                        if len(self.text) < self._length:
-                            terminal.move_cursor_left()
-                        terminal.print_text(self._placeholder)
-                        terminal.move_cursor_left()
-                        self.text = (self.text[0:-1])
-                else:
-                    return key
-            else:
-                if len(self.text) >= self._length:
+            key = self.handle_input(terminal, sep, key)
+            if key is not None:
+                return key
+
+    def focus(self, terminal):
+        """
+        Moves the cursor to this input
+        """
+        if self._length > 0:
+            # Move to end of text
+            offset = len(self.text)
+            if offset >= self._length:
+                offset = self._length - 1
+                if offset < 1:
+                    offset = 1
+            terminal.move_cursor(self._locx + offset, self._locy)
+            terminal.text_colour(self._colour)
+            terminal.visible_cursor(True)
+        else:
+            terminal.visible_cursor(False)
+
+    def handle_input(self, terminal, sep, key):
+        """
+        Process a key received by Terminal.wait_input
+        Returns the key if it ends the input, None otherwise
+        """
+        if sep is True:
+            # Minitel key
+            if key == Terminal.CORRECTION:
+                if len(self.text) < 1:
                     terminal.bell()
                 else:
-                    c = chr(key)
-                    self.text += c
-                    terminal.print_text(c)
-                    # Move back if we are at the end of the field
-                    if len(self.text) >= self._length:
+                    # Don't move back if we are at the end of the field
+                    if len(self.text) < self._length:
                         terminal.move_cursor_left()
-            logger.debug("New text is {}".format(self.text))
+                    terminal.print_text(self._placeholder)
+                    terminal.move_cursor_left()
+                    self.text = (self.text[0:-1])
+            else:
+                return key
+        else:
+            if len(self.text) >= self._length:
+                terminal.bell()
+            else:
+                c = key if isinstance(key, str) else chr(key)
+                self.text += c
+                terminal.print_text(c)
+                # Move back if we are at the end of the field
+                if len(self.text) >= self._length:
+                    terminal.move_cursor_left()
+        logger.debug("New text is %s", self.text)
+        return None
@@ -0,0 +1,94 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+
+Binary per-session I/O trace
+A trace file starts with MAGIC followed by records made of a RECORD
+header (timestamp, direction, length) and the wire bytes
+
+Dump a trace with: python -m minitel_server.trace file.mtrace
+"""
+import logging
+import os
+import struct
+import sys
+import time
+from threading import Lock
+
+from minitel_server.configuration import Configuration
+
+logger = logging.getLogger('Trace')
+
+MAGIC = b'MTRC\x01'
+RECORD = struct.Struct('<dBI')
+# Directions
+INPUT = 0
+OUTPUT = 1
+
+
+class IOTrace(object):
+    """
+    Records every byte exchanged with a Minitel
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = open(filename, 'wb')
+        self._file.write(MAGIC)
+        self._lock = Lock()
+
+    @staticmethod
+    def create(ip, port):
+        """
+        Creates the trace of a new session if traces are enabled
+        (trace_folder in configuration), returns None otherwise
+        """
+        if Configuration.trace_folder is None:
+            return None
+        filename = os.path.join(Configuration.trace_folder, '{}_{}_{}_{}.mtrace'.format(
+            time.strftime('%Y%m%d-%H%M%S'), port, ip, os.getpid()))
+        try:
+            os.makedirs(Configuration.trace_folder, exist_ok=True)
+            return IOTrace(filename)
+        except OSError as e:
+            logger.error("Unable to create trace {} : {}".format(filename, e))
+            return None
+
+    def record(self, direction, data):
+        """ Appends a record """
+        with self._lock:
+            if self._file is not None:
+                self._file.write(RECORD.pack(time.time(), direction, len(data)))
+                self._file.write(data)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_trace(filename):
+    """
+    Reads a trace file, yields (timestamp, direction, data)
+    """
+    with open(filename, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("{} is not a trace file".format(filename))
+        while True:
+            header = f.read(RECORD.size)
+            if len(header) < RECORD.size:
+                return
+            timestamp, direction, length = RECORD.unpack(header)
+            yield timestamp, direction, f.read(length)
+
+
+def main():
+    for filename in sys.argv[1:]:
+        for timestamp, direction, data in read_trace(filename):
+            print("{:.6f} {} {}".format(timestamp, '<' if direction == INPUT else '>', data.hex(' ')))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+
+Videotex page optimizer
+Replays a page on the virtual screen and renders the shortest stream
+giving the same screen. The result is replayed to check it is
+equivalent, the page is kept as is otherwise.
+
+Usage: python -m minitel_server.vdt_optimizer [--in-place | --output folder] [files or folders]
+"""
+import argparse
+import logging
+import os
+import sys
+
+from minitel_server.encoding import compress_repeats
+from minitel_server.pacer import bytes_per_second
+from minitel_server.screen import Screen, COLUMNS, UNKNOWN
+
+logger = logging.getLogger('VdtOptimizer')
+
+CLEAR_SCREEN = 0x0C
+EXTENSIONS = ('.vdt', '.vtx')
+# The status row is not cleared by FF, its content before the page is unknown
+def _start_screen():
+    screen = Screen()
+    screen.cells[0] = [UNKNOWN] * (COLUMNS + 1)
+    return screen
+
+
+def optimize(data):
+    """
+    Gets the shortest stream equivalent to data
+    Only pages starting by a clear screen and modelled by the screen can
+    be optimized, others are returned unchanged
+    """
+    data = bytes(data)
+    if CLEAR_SCREEN not in data:
+        return data
+    screen = _start_screen()
+    screen.feed(data)
+    if not screen.valid or screen.side_effects:
+        return data
+    optimized = compress_repeats(bytes((CLEAR_SCREEN,)) + screen.render(_start_screen()))
+    check = _start_screen()
+    check.feed(optimized)
+    if not check.valid or not check.same_state(screen):
+        logger.warning("Optimized stream is not equivalent, keeping original")
+        return data
+    if len(optimized) < len(data):
+        return optimized
+    return data
+
+
+def read_optimized(filename):
+    """ Reads a page and optimizes it """
+    with open(filename, 'rb') as f:
+        return optimize(f.read())
+
+
+def find_pages(paths):
+    """
+    Gets the (file, path relative to the folder given) of the Videotex files
+    in paths, a file given is relative to its folder
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _dirs, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith(EXTENSIONS):
+                        filename = os.path.join(root, name)
+                        yield filename, os.path.relpath(filename, path)
+        else:
+            yield path, os.path.basename(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Optimizes Videotex pages')
+    parser.add_argument('paths', nargs='*', default=['pages'], help='Files or folders (default pages)')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--in-place', action='store_true', help='Replaces the optimized files')
+    group.add_argument('--output', help='Writes the optimized files in this folder')
+    args = parser.parse_args(argv)
+
+    rate = bytes_per_second(1200)
+    total_before = total_after = 0
+    print("{:<50} {:>7} {:>7} {:>8}".format('file', 'bytes', 'optim.', 'saved'))
+    for filename, relative in find_pages(args.paths):
+        with open(filename, 'rb') as f:
+            data = f.read()
+        optimized = optimize(data)
+        total_before += len(data)
+        total_after += len(optimized)
+        print("{:<50} {:>7} {:>7} {:>7.2f}s".format(
+            filename, len(data), len(optimized), (len(data) - len(optimized)) / rate))
+        if optimized is data:
+            continue
+        if args.in_place:
+            target = filename
+        elif args.output:
+            if os.path.isabs(relative) or relative.split(os.sep)[0] in ('', os.pardir):
+                logger.error("{} is outside the folder given, not written".format(filename))
+                continue
+            target = os.path.join(args.output, relative)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+        else:
+            continue
+        with open(target, 'wb') as f:
+            f.write(optimized)
+    print("{:<50} {:>7} {:>7} {:>7.2f}s at 1200 bps".format(
+        'total', total_before, total_after, (total_before - total_after) / rate))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Created on 18 Oct 2026
+
+@author: mdonze
+"""
+import logging
+import logging.handlers
+import multiprocessing
+import multiprocessing.connection
+import signal
+import time
+
+logger = logging.getLogger('Supervisor')
+
+
+def _worker_main(index, log_queue, target, args):
+    """
+    Entry point of a worker process
+    Sends every log record to the supervisor
+    """
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    logger.info("Worker {} started".format(index))
+    target(*args)
+
+
+class WorkerSupervisor(object):
+    """
+    Forks worker processes all serving the same ports (with SO_REUSEPORT)
+    and restarts them if they crash
+    """
+    # Seconds to wait before restarting a worker
+    RESTART_DELAY = 1.0
+    # A worker dying before this amount of seconds doubles the restart delay
+    MIN_UPTIME = 10.0
+    MAX_RESTART_DELAY = 60.0
+
+    def __init__(self, workers, target, args=()):
+        """
+        Constructor
+        workers : Number of worker processes
+        target : Function run by each worker
+        args : Arguments of the target function
+        """
+        self.workers = workers
+        self.target = target
+        self.args = args
+        self._context = multiprocessing.get_context('fork')
+        self._log_queue = self._context.Queue()
+        self._processes = {}
+        self._started_at = {}
+        self._restart_delay = {}
+        # Monotonic time a dead worker is started again, by index
+        self._restart_at = {}
+        self._running = False
+
+    def _start_worker(self, index):
+        process = self._context.Process(target=_worker_main,
+                                        name='worker-{}'.format(index),
+                                        args=(index, self._log_queue, self.target, self.args))
+        process.start()
+        self._processes[index] = process
+        self._started_at[index] = time.monotonic()
+        logger.info("Started worker {} (PID {})".format(index, process.pid))
+
+    def _restart_worker(self, index):
+        """ Schedules the restart of a dead worker """
+        process = self._processes.pop(index)
+        uptime = time.monotonic() - self._started_at[index]
+        delay = self._restart_delay.get(index, self.RESTART_DELAY)
+        if uptime < self.MIN_UPTIME:
+            delay = min(delay * 2, self.MAX_RESTART_DELAY)
+        else:
+            delay = self.RESTART_DELAY
+        self._restart_delay[index] = delay
+        logger.error("Worker {} (PID {}) exited with code {}, restarting in {:.1f}s".format(
+            index, process.pid, process.exitcode, delay))
+        self._restart_at[index] = time.monotonic() + delay
+
+    def _start_due_workers(self):
+        """ Starts the dead workers whose restart delay elapsed """
+        now = time.monotonic()
+        for index in [index for index, when in self._restart_at.items() if when <= now]:
+            del self._restart_at[index]
+            self._start_worker(index)
+
+    def _stop(self, _signum=None, _frame=None):
+        self._running = False
+
+    def run(self):
+        """
+        Starts the workers and supervise them until interrupted
+        """
+        listener = logging.handlers.QueueListener(self._log_queue, *logging.getLogger().handlers,
+                                                  respect_handler_level=True)
+        listener.start()
+        signal.signal(signal.SIGTERM, self._stop)
+        self._running = True
+        try:
+            for i in range(self.workers):
+                self._start_worker(i)
+            while self._running:
+                # Wakes up for the next restart or at least every second (SIGTERM)
+                timeout = 1.0
+                if self._restart_at:
+                    timeout = min(max(min(self._restart_at.values()) - time.monotonic(), 0), timeout)
+                sentinels = {p.sentinel: i for i, p in self._processes.items()}
+                for ready in multiprocessing.connection.wait(list(sentinels), timeout=timeout):
+                    index = sentinels[ready]
+                    self._processes[index].join()
+                    if self._running:
+                        self._restart_worker(index)
+                if self._running:
+                    self._start_due_workers()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._running = False
+            logger.info("Stopping workers")
+            for process in self._processes.values():
+                if process.is_alive():
+                    process.terminate()
+            for process in self._processes.values():
+                process.join()
+            listener.stop()
@@ -3,8 +3,10 @@ Created on 09 Jan 2020
 
 @author: mdonze
 """
+from minitel_server.async_server import AsyncDefaultPageHandler
 from minitel_server.page import DefaultPageHandler, PageContext, \
     Page
+import asyncio
 import logging
 from minitel_server.terminal import Terminal
 from minitel_server.exceptions import UserTerminateSessionError, MinitelTimeoutError
@@ -27,8 +29,7 @@ class HandlerDemo(DefaultPageHandler):
         super().__init__(minitel, context)
 
     def after_rendering(self):
-        vdt_folder = os.path.join(self.context.current_page.page_folder, 'vdts', '*.vdt')
-        vdt_files = glob.glob(vdt_folder)
+        vdt_files = get_vdt_files(self.context.current_page)
         logger.info(f'Found {len(vdt_files)} files')
         while True:
             for vdt_file in vdt_files:
@@ -39,12 +40,52 @@ class HandlerDemo(DefaultPageHandler):
                     self.minitel.draw_file(vdt_file)
                     # Waits for a key press (the form is empty)
                     sep, key = self.minitel.wait_input(2)
-                    if sep is True:
-                        if key == Terminal.RETOUR:
-                            next_page = Page.get_page(self.context.current_page.service, None)
-                            return PageContext(self, next_page)
-                        if key == Terminal.CONNEXION_FIN:
-                            logger.debug("Connection/fin from {}".format(self.context.current_page.fullname))
-                            raise UserTerminateSessionError
+                    next_context = get_next_context(self, sep, key)
+                    if next_context is not None:
+                        return next_context
                 except MinitelTimeoutError:
-                    pass        
+                    pass
+
+
+class AsyncHandlerDemo(AsyncDefaultPageHandler):
+    """
+    Demo handler running on the event loop (asyncio server)
+    """
+
+    async def after_rendering(self):
+        loop = asyncio.get_running_loop()
+        vdt_files = await loop.run_in_executor(None, get_vdt_files, self.context.current_page)
+        logger.info(f'Found {len(vdt_files)} files')
+        while True:
+            for vdt_file in vdt_files:
+                try:
+                    logger.info(f'VDT file is {str(vdt_file)}')
+                    self.minitel.clear_screen()
+                    self.minitel.draw_file(vdt_file)
+                    sep, key = await self.minitel.wait_input(2)
+                    next_context = get_next_context(self, sep, key)
+                    if next_context is not None:
+                        return next_context
+                except MinitelTimeoutError:
+                    pass
+
+
+def get_vdt_files(page):
+    """
+    Gets the files shown in turn by the demo
+    """
+    return glob.glob(os.path.join(page.page_folder, 'vdts', '*.vdt'))
+
+
+def get_next_context(handler, sep, key):
+    """
+    Gets the context of the page selected by a key, None to keep showing the demo
+    """
+    if sep is True:
+        if key == Terminal.RETOUR:
+            next_page = Page.get_page(handler.context.current_page.service, None)
+            return PageContext(handler, next_page)
+        if key == Terminal.CONNEXION_FIN:
+            logger.debug("Connection/fin from {}".format(handler.context.current_page.fullname))
+            raise UserTerminateSessionError
+    return None
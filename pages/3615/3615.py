@@ -5,11 +5,14 @@ Created on 5 Nov 2019
 '''
 
 import logging
-import os
 
+import asyncio
+
+from minitel_server.async_server import AsyncPageHandler
 from minitel_server.page import PageHandler
 from minitel_server.page import Page
 from minitel_server.page import PageContext
+from minitel_server.service_directory import ServiceDirectory
 from minitel_server.terminal import Terminal, FormInput
 import time
 from minitel_server.exceptions import UserTerminateSessionError
@@ -17,18 +20,125 @@ from minitel_server.exceptions import UserTerminateSessionError
 logger = logging.getLogger('3615page')
 
 
-class Handler3615(PageHandler):
+class Guide3615(object):
+    '''
+    Lookup and drawing shared by the 3615 handlers
+    '''
+    # Services listed per guide page (2 columns)
+    GUIDE_ROWS = 19
+    GUIDE_SIZE = 2 * GUIDE_ROWS
+
+    def add_service_form(self):
+        self.minitel.clear_form_inputs()
+        form_input = FormInput(12, 17, 29, '', Terminal.YELLOW)
+        self.minitel.add_form_input(form_input)
+
+    def get_next_pages(self):
+        return self.getdirectory().get_names()
+
+    def getdirectory(self):
+        ''' Gets the index of child folders '''
+        return ServiceDirectory.get_directory(self.context.current_page.page_folder)
+
+    def getpage(self, name):
+        ''' Gets a new page if found in child folder (exact, prefix or closest name) '''
+        dir_name = self.getdirectory().find(name)
+        if dir_name is None:
+            return None
+        logger.debug("Found page {}".format(dir_name))
+        return Page.get_page(self.context.current_page.service, dir_name)
+
+    def drawguide(self, pagesnum):
+        ''' Draws the first page of the list of available pages, returns the number of pages '''
+        self.minitel.clear_screen()
+        self.minitel.move_cursor(1, 2)
+        self.minitel.double_height_size()
+        self.minitel.print_text("Services disponibles")
+        self.minitel.normal_size()
+        self.minitel.move_cursor(1, 3)
+        self.minitel.text_colour(Terminal.BLUE)
+        self.minitel.print_repeat('`', 40)
+        self.minitel.move_cursor(1, 23)
+        self.minitel.text_colour(Terminal.BLUE)
+        self.minitel.print_repeat('`', 40)
+        self.minitel.move_cursor(1, 24)
+        self.minitel.text_colour(Terminal.WHITE)
+        self.minitel.print_text("          Numéro du service: ..  + ")
+        self.minitel.reverse_video()
+        self.minitel.print_text("ENVOI")
+        self.minitel.normal_video()
+        pages = max(1, (len(pagesnum) + self.GUIDE_SIZE - 1) // self.GUIDE_SIZE)
+        self.showservicelist(pagesnum, 0, pages)
+        ''' Make zone '''
+        self.minitel.clear_form_inputs()
+        self.minitel.add_form_input(FormInput(30, 24, max(2, len(str(len(pagesnum)))), '', True))
+        return pages
+
+    def selectservice(self, pagesnum):
+        ''' Gets the context of the page whose number was typed, None if invalid '''
+        try:
+            pageindex = int(self.minitel.forms[0].text)
+            if pageindex < 1:
+                raise IndexError(pageindex)
+            logger.debug('Selected page {:d}/{}'.format(pageindex, pagesnum[pageindex - 1]))
+            nextpage = Page.get_page(self.context.current_page.service, pagesnum[pageindex - 1])
+            return PageContext(self, nextpage)
+        except:
+            self.minitel.bell()
+            return None
+
+    def showservicelist(self, names, page, pages):
+        ''' Show a page of the list of available pages '''
+        with self.minitel.screen_update():
+            if pages > 1:
+                self.minitel.move_cursor(33, 2)
+                self.minitel.print_text("{:>3}/{:<3}".format(page + 1, pages))
+            for i in range(self.GUIDE_SIZE):
+                index = page * self.GUIDE_SIZE + i
+                text = ''
+                if index < len(names):
+                    text = "{:02d} {}".format(index + 1, names[index][0:16])
+                self.minitel.move_cursor(1 if i < self.GUIDE_ROWS else 21, 4 + i % self.GUIDE_ROWS)
+                self.minitel.print_text(text.ljust(20))
+
+    def drawprice(self, step):
+        ''' Draws a step (0 to 2) of the price page '''
+        if step == 0:
+            self.minitel.clear_screen()
+            self.minitel.move_cursor(1, 2)
+            self.minitel.double_height_size()
+            self.minitel.print_text("Prix des services")
+            self.minitel.normal_size()
+            self.minitel.move_cursor(1, 3)
+            self.minitel.text_colour(Terminal.BLUE)
+            self.minitel.print_repeat('`', 40)
+            self.minitel.move_cursor(1, 5)
+            self.minitel.double_height_size()
+            self.minitel.print_text("A l'époque ces services")
+            self.minitel.move_cursor(1, 7)
+            self.minitel.double_height_size()
+            self.minitel.print_text("Minitels coutaient tellement cher!")
+        elif step == 1:
+            self.minitel.move_cursor(1, 10)
+            self.minitel.double_height_size()
+            self.minitel.print_text("Cela a fait la fortune de certains...")
+            self.minitel.move_cursor(1, 12)
+            self.minitel.normal_size()
+            self.minitel.print_text("Coucou Xavier :-)")
+
+
+class Handler3615(Guide3615, PageHandler):
     '''
     Handler for 3615 connection
     '''
+    # The guide is drawn with screen_update()
+    SCREEN_MODEL = True
 
     def __init__(self, minitel, context):
         super().__init__(minitel, context)
 
     def before_rendering(self):
-        self.minitel.clear_form_inputs()
-        form_input = FormInput(12, 17, 29, '', Terminal.YELLOW)
-        self.minitel.add_form_input(form_input)
+        self.add_service_form()
 
     def render(self):
         page = self.context.current_page
@@ -57,66 +167,29 @@ class Handler3615(PageHandler):
                 raise UserTerminateSessionError
         return None
 
-    def getpage(self, name):
-        ''' Gets a new page if found in child folder '''
-        name = name.lower()
-        next_page = None
-        for dirName in next(os.walk(self.context.current_page.page_folder))[1]:
-            if dirName.lower() == name:
-                logger.debug("Found page {}".format(name))
-                next_page = Page.get_page(self.context.current_page.service, name)
-        return next_page
-
     def shownotfound(self):
         ''' Show a not found message '''
         self.minitel.show_message('Service non trouvé')
 
     def showavailableservice(self):
         ''' Show list of available pages '''
-        self.minitel.clear_screen()
-        self.minitel.move_cursor(1, 2)
-        self.minitel.double_height_size()
-        self.minitel.print_text("Services disponibles")
-        self.minitel.normal_size()
-        self.minitel.move_cursor(1, 3)
-        self.minitel.text_colour(Terminal.BLUE)
-        self.minitel.print_repeat('`', 40)
-        self.minitel.move_cursor(1, 23)
-        self.minitel.text_colour(Terminal.BLUE)
-        self.minitel.print_repeat('`', 40)
-        self.minitel.move_cursor(1, 24)
-        self.minitel.text_colour(Terminal.WHITE)
-        self.minitel.print_text("          Numéro du service: ..  + ")
-        self.minitel.reverse_video()
-        self.minitel.print_text("ENVOI")
-        self.minitel.normal_video()
-        i = 0
-        x = 1
-        pagesnum = []
-        for dirName in next(os.walk(self.context.current_page.page_folder))[1]:
-            if not dirName.startswith('_'):
-                self.minitel.move_cursor(x, 4 + i)
-                pagesnum.append(dirName)
-                self.minitel.print_text("{:02d} {}".format(len(pagesnum),
-                                                           dirName[0:16]))
-                i = i + 1
-                if i > 18:
-                    x = 21
-                    i = 0
-        ''' Make zone '''
-        self.minitel.clear_form_inputs()
-        self.minitel.add_form_input(FormInput(30, 24, 2, '', True))
+        pagesnum = self.getdirectory().get_names()
+        pages = self.drawguide(pagesnum)
+        page = 0
         while True:
-            key = self.minitel.wait_form_inputs()
+            key = self.minitel.wait_form_inputs(force_form=0)
             if key == Terminal.ENVOI:
-                try:
-                    pageindex = int(self.minitel.forms[0].text)
-                    logger.debug('Selected page {:d}/{}'.format(pageindex, pagesnum[pageindex - 1]))
-                    nextpage = Page.get_page(self.context.current_page.service, pagesnum[pageindex - 1])
-                    return PageContext(self, nextpage)
-                except:
+                context = self.selectservice(pagesnum)
+                if context is not None:
+                    return context
+                self.minitel.show_message('Mauvais numéro', 2)
+            if key in (Terminal.SUITE, Terminal.RETOUR):
+                new_page = page + 1 if key == Terminal.SUITE else page - 1
+                if 0 <= new_page < pages:
+                    page = new_page
+                    self.showservicelist(pagesnum, page, pages)
+                else:
                     self.minitel.bell()
-                    self.minitel.show_message('Mauvais numéro', 2)
             if key == Terminal.ANNULATION:
                 break
             if key == Terminal.SOMMAIRE:
@@ -126,26 +199,75 @@ class Handler3615(PageHandler):
         return None
 
     def showprice(self):
-        self.minitel.clear_screen()
-        self.minitel.move_cursor(1, 2)
-        self.minitel.double_height_size()
-        self.minitel.print_text("Prix des services")
-        self.minitel.normal_size()
-        self.minitel.move_cursor(1, 3)
-        self.minitel.text_colour(Terminal.BLUE)
-        self.minitel.print_repeat('`', 40)
-        self.minitel.move_cursor(1, 5)
-        self.minitel.double_height_size()
-        self.minitel.print_text("A l'époque ces services")
-        self.minitel.move_cursor(1, 7)
-        self.minitel.double_height_size()
-        self.minitel.print_text("Minitels coutaient tellement cher!")
+        self.drawprice(0)
+        self.minitel.flush()
         time.sleep(2.0)
-        self.minitel.move_cursor(1, 10)
-        self.minitel.double_height_size()
-        self.minitel.print_text("Cela a fait la fortune de certains...")
-        self.minitel.move_cursor(1, 12)
-        self.minitel.normal_size()
-        self.minitel.print_text("Coucou Xavier :-)")
+        self.drawprice(1)
+        self.minitel.flush()
         time.sleep(2.0)
         return None
+
+
+class AsyncHandler3615(Guide3615, AsyncPageHandler):
+    '''
+    Handler for 3615 connection running on the event loop (asyncio server)
+    '''
+    # The guide is drawn with screen_update()
+    SCREEN_MODEL = True
+
+    async def before_rendering(self):
+        self.add_service_form()
+
+    async def render(self):
+        self.minitel.draw_file(self.context.current_page.get_page_data())
+        await self.minitel.drain()
+
+    async def after_rendering(self):
+        while True:
+            self.minitel.forms[0].initial_draw = True
+            key = await self.minitel.wait_form_inputs()
+
+            if key == Terminal.ENVOI:
+                logger.debug("Envoi from {}".format(self.context.current_page.page_folder))
+                nextpage = self.getpage(self.minitel.forms[0].text)
+                if nextpage is not None:
+                    return PageContext(self, nextpage)
+                await self.minitel.show_message('Service non trouvé')
+            if key == Terminal.GUIDE:
+                logger.debug("Guide from {}".format(self.context.current_page.page_folder))
+                return await self.showavailableservice()
+            if key == Terminal.SOMMAIRE:
+                return await self.showprice()
+            if key == Terminal.CONNEXION_FIN:
+                raise UserTerminateSessionError
+
+    async def showavailableservice(self):
+        ''' Show list of available pages '''
+        pagesnum = self.getdirectory().get_names()
+        pages = self.drawguide(pagesnum)
+        page = 0
+        while True:
+            key = await self.minitel.wait_form_inputs(force_form=0)
+            if key == Terminal.ENVOI:
+                context = self.selectservice(pagesnum)
+                if context is not None:
+                    return context
+                await self.minitel.show_message('Mauvais numéro', 2)
+            if key in (Terminal.SUITE, Terminal.RETOUR):
+                new_page = page + 1 if key == Terminal.SUITE else page - 1
+                if 0 <= new_page < pages:
+                    page = new_page
+                    self.showservicelist(pagesnum, page, pages)
+                else:
+                    self.minitel.bell()
+            if key in (Terminal.ANNULATION, Terminal.SOMMAIRE, Terminal.GUIDE):
+                return None
+
+    async def showprice(self):
+        self.drawprice(0)
+        await self.minitel.drain()
+        await asyncio.sleep(2.0)
+        self.drawprice(1)
+        await self.minitel.drain()
+        await asyncio.sleep(2.0)
+        return None
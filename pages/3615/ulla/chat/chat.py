@@ -15,11 +15,16 @@ import threading
 
 logger = logging.getLogger('Ullapage')
 
+# The chat room is shared by all sessions, a reloaded module would open a second room
+HOT_RELOAD = False
+
 
 class HandlerUllaChat(DefaultPageHandler):
     """
     A basic chat for Ulla
     """
+    # Messages are drawn with screen_update()
+    SCREEN_MODEL = True
 
     class __UllaChatRoom(threading.Thread):
         """
@@ -98,29 +103,30 @@ class HandlerUllaChat(DefaultPageHandler):
                             self._messages.append(item)
                         except queue.Empty:
                             break
-                    if update_user_count:
-                        self.minitel.move_cursor(1, 3)
-                        count = HandlerUllaChat.chat_room.get_user_count()
-                        if count == 1:
-                            self.minitel.print_text("1 utilisateur en ligne")
-                        else:
-                            self.minitel.print_text(
-                                "{} utilisateurs en ligne".format(count))
-                        self.minitel.clear_eol()
-
-                    i = 5
-                    for m in self._messages:
-                        if m['type'] == 'message':
-                            self.minitel.move_cursor(1, i)
-                            self.minitel.text_colour(Terminal.MAGENTA)
-                            self.minitel.reverse_video()
-                            self.minitel.print_text(m['user'])
-                            self.minitel.normal_video()
-                            self.minitel.text_colour(Terminal.WHITE)
-                            self.minitel.print_text(m['message'])
+                    with self.minitel.screen_update():
+                        if update_user_count:
+                            self.minitel.move_cursor(1, 3)
+                            count = HandlerUllaChat.chat_room.get_user_count()
+                            if count == 1:
+                                self.minitel.print_text("1 utilisateur en ligne")
+                            else:
+                                self.minitel.print_text(
+                                    "{} utilisateurs en ligne".format(count))
                             self.minitel.clear_eol()
-                            i = i + 1
-                    logger.debug("Messages printed")
+
+                        i = 5
+                        for m in self._messages:
+                            if m['type'] == 'message':
+                                self.minitel.move_cursor(1, i)
+                                self.minitel.text_colour(Terminal.MAGENTA)
+                                self.minitel.reverse_video()
+                                self.minitel.print_text(m['user'])
+                                self.minitel.normal_video()
+                                self.minitel.text_colour(Terminal.WHITE)
+                                self.minitel.print_text(m['message'])
+                                self.minitel.clear_eol()
+                                i = i + 1
+                        logger.debug("Messages printed")
 
                 try:
                     key = self.minitel.wait_form_inputs(timeout=0.1, move_cursor=cursor_moved)
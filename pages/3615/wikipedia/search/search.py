@@ -24,6 +24,8 @@ class Search(DefaultPageHandler):
     """
     Search page
     """
+    # Results are drawn with screen_update()
+    SCREEN_MODEL = True
     MAX_TEXT_LEN = 40
     NB_LINES = 20
 
@@ -169,14 +171,15 @@ class Search(DefaultPageHandler):
         self.minitel.move_cursor(38, 24)
         self.minitel.print_text("/{}".format(nb_pages))
         while True:
-            self.minitel.move_cursor(1, 3)
-            self.minitel.forms[0].text = "{:<3}".format(page_number + 1)
-            for i in range(0, Search.NB_LINES):
-                line_number = page_number * Search.NB_LINES + i
-                if line_number < len(chunks):
-                    self.minitel.print_text(chunks[line_number])
-                self.minitel.clear_eol()
-                self.minitel.move_cursor(1, 4 + i)
+            with self.minitel.screen_update():
+                self.minitel.move_cursor(1, 3)
+                self.minitel.forms[0].text = "{:<3}".format(page_number + 1)
+                for i in range(0, Search.NB_LINES):
+                    line_number = page_number * Search.NB_LINES + i
+                    if line_number < len(chunks):
+                        self.minitel.print_text(chunks[line_number])
+                    self.minitel.clear_eol()
+                    self.minitel.move_cursor(1, 4 + i)
             while True:
                 self.minitel.forms[0].initial_draw = True
                 key = self.minitel.wait_form_inputs(force_form=0)